@@ -1,16 +1,13 @@
 # Smart Habit & Productivity Tracker - Clean Professional Edition
 import streamlit as st
 import pandas as pd
-import plotly.express as px
-import plotly.graph_objects as go
+import numpy as np
 from datetime import datetime, timedelta
 from io import BytesIO
 from config import ENABLE_AI, GEMINI_MODEL, ENABLE_PDF_EXPORT
-from database import create_tables, insert_log, fetch_logs, export_csv, update_log, fetch_log_by_id
-from data_processing import get_dataframe, weekly_summary, monthly_summary, activity_heatmap_data, compute_productivity_score
-from ml_utils import get_clusters, train_regression, predict_next
-from recommendations import get_gemini_reco
-import export_utils
+from database import create_tables, insert_log, fetch_logs, update_log, fetch_log_by_id, fetch_summary_stats, get_db_mtime
+from data_processing import (get_dataframe, get_recent_dataframe, activity_heatmap_data,
+                             compute_productivity_score, correlation_matrix)
 
 # Configuration
 st.set_page_config(
@@ -22,34 +19,202 @@ st.set_page_config(
 
 create_tables()
 
+MOODS = ("", "happy", "good", "ok", "tired", "stressed")
+MOOD_IDX = {m: i for i, m in enumerate(MOODS)}
+
 # Helper Functions
 def refresh_df():
+    # get_dataframe() is cached on the DB file's mtime, so no extra layer here
     return get_dataframe()
 
+def recent_logs(n):
+    # keyed on the DB mtime like get_dataframe(), so outside writes show up at once
+    return _recent_logs(get_db_mtime(), n)
+
+@st.cache_data(ttl=300)
+def _recent_logs(mtime, n):
+    return get_recent_dataframe(n)
+
+def db_stats():
+    return _db_stats(get_db_mtime())
+
+@st.cache_data(ttl=300)
+def _db_stats(mtime):
+    return fetch_summary_stats()
+
+def hash_df(df):
+    # Cheap content fingerprint used as the cache key for derived results
+    return pd.util.hash_pandas_object(df, index=False).values.tobytes()
+
+@st.cache_data
+def _summary_stats(df_hash, _df):
+    # one combined mean+std reduction instead of six separate Series calls
+    agg = _df[['sleep_hours', 'study_hours', 'productivity_score']].agg(['mean', 'std'])
+    return {
+        'sleep_mean': agg.at['mean', 'sleep_hours'],
+        'sleep_std': agg.at['std', 'sleep_hours'],
+        'study_mean': agg.at['mean', 'study_hours'],
+        'study_std': agg.at['std', 'study_hours'],
+        'prod_mean': agg.at['mean', 'productivity_score'],
+        'prod_std': agg.at['std', 'productivity_score'],
+    }
+
+@st.cache_data
+def _moving_avgs(df_hash, _df, window):
+    # one rolling pass over both columns; cached per (data, window) pair
+    ma = _df[['sleep_hours', 'study_hours']].rolling(window=window).mean()
+    ma.columns = ['sleep_ma', 'study_ma']
+    return ma
+
+@st.cache_data
+def _corr(df_hash, _df, cols):
+    return correlation_matrix(_df, cols)
+
+@st.cache_data
+def _csv_bytes(df_hash, _df):
+    buf = BytesIO()
+    _df.to_csv(buf, index=False)
+    return buf.getvalue()
+
 def create_metric_card(label, value, delta=None, help_text=None):
     st.metric(label=label, value=value, delta=delta, help=help_text)
 
-def create_gauge_chart(value, title, max_value=10):
-    fig = go.Figure(go.Indicator(
-        mode="gauge+number",
-        value=value,
-        domain={'x': [0, 1], 'y': [0, 1]},
-        title={'text': title, 'font': {'size': 18}},
-        gauge={
-            'axis': {'range': [None, max_value], 'tickwidth': 1},
-            'bar': {'color': "#4F46E5"},
-            'bgcolor': "white",
-            'borderwidth': 2,
-            'bordercolor': "#E5E7EB",
-            'steps': [
-                {'range': [0, max_value*0.33], 'color': '#FEF3C7'},
-                {'range': [max_value*0.33, max_value*0.66], 'color': '#DDD6FE'},
-                {'range': [max_value*0.66, max_value], 'color': '#D1FAE5'}
-            ],
-        }
-    ))
-    fig.update_layout(height=250, margin=dict(l=20, r=20, t=50, b=20))
-    return fig
+# Analytics tabs: each is a fragment, so widget interactions inside a tab
+# rerun only that tab instead of the whole script
+@st.fragment
+def _trends_tab(df, h):
+    import charts
+
+    st.subheader("Long-term Trends")
+
+    # Combined trend chart
+    fig = charts.create_metrics_over_time_chart(h, df)
+    st.plotly_chart(fig, use_container_width=True)
+
+    # Moving averages (slider sits in a form so dragging doesn't recompute mid-drag)
+    col1, col2 = st.columns(2)
+    with col1:
+        with st.form("ma_form"):
+            window = st.slider("Moving Average Window", 3, 14, 7, key="ma_window")
+            st.form_submit_button("Update")
+
+    ma = _moving_avgs(h, df, window)
+
+    fig_ma = charts.create_moving_average_chart(h, df['date'], ma, window)
+    st.plotly_chart(fig_ma, use_container_width=True)
+
+@st.fragment
+def _distributions_tab(df, h):
+    import charts
+
+    st.subheader("Distribution Analysis")
+
+    col1, col2 = st.columns(2)
+
+    with col1:
+        fig_sleep_dist = charts.create_histogram(h, df, 'sleep_hours', 'Sleep Hours Distribution',
+                                                 'Sleep Hours', '#4F46E5')
+        st.plotly_chart(fig_sleep_dist, use_container_width=True)
+
+    with col2:
+        fig_study_dist = charts.create_histogram(h, df, 'study_hours', 'Study Hours Distribution',
+                                                 'Study Hours', '#7C3AED')
+        st.plotly_chart(fig_study_dist, use_container_width=True)
+
+    # Box plots and Mood Distribution
+    col1, col2 = st.columns(2)
+
+    with col1:
+        fig_box = charts.create_box_plot(h, df)
+        st.plotly_chart(fig_box, use_container_width=True)
+
+    with col2:
+        if 'mood' in df.columns and df['mood'].notna().any():
+            fig_mood = charts.create_mood_pie_chart(h, df)
+            st.plotly_chart(fig_mood, use_container_width=True)
+
+@st.fragment
+def _correlations_tab(df, h):
+    import charts
+
+    st.subheader("Correlation Analysis")
+
+    # Scatter plot
+    fig_scatter = charts.create_sleep_study_scatter(h, df)
+    st.plotly_chart(fig_scatter, use_container_width=True)
+
+    # Correlation heatmap
+    corr_cols = ['sleep_hours', 'study_hours', 'productivity_score']
+    if 'water_intake' in df.columns:
+        corr_cols.append('water_intake')
+    if 'steps' in df.columns:
+        corr_cols.append('steps')
+
+    corr_matrix = _corr(h, df, corr_cols)
+
+    fig_heatmap = charts.create_correlation_heatmap(h, corr_matrix)
+    st.plotly_chart(fig_heatmap, use_container_width=True)
+
+@st.fragment
+def _ml_tab(df, h):
+    import charts
+    from ml_utils import get_clusters, train_regression, predict_next
+
+    st.subheader("Machine Learning Insights")
+
+    col1, col2 = st.columns(2)
+
+    with col1:
+        st.markdown("##### K-Means Clustering")
+        with st.spinner("Running clustering algorithm..."):
+            clusters, km_model, cluster_err = get_clusters(df)
+
+        if cluster_err:
+            st.warning(f"{cluster_err}")
+        else:
+            df_cluster = df.copy()
+            df_cluster['Cluster'] = clusters
+
+            fig_cluster = charts.create_cluster_chart(h, df_cluster)
+            st.plotly_chart(fig_cluster, use_container_width=True)
+
+            st.info(f"Identified {len(set(clusters))} distinct patterns in your habits")
+
+    with col2:
+        st.markdown("##### Predictive Analytics")
+        models, reg_err = train_regression(df)
+
+        if reg_err:
+            st.warning(f"{reg_err}")
+        else:
+            exp_sleep = st.slider("Expected sleep hours tomorrow",
+                                min_value=0.0, max_value=12.0,
+                                value=7.0, step=0.5)
+
+            if st.button("Generate Prediction", use_container_width=True):
+                with st.spinner("Calculating prediction..."):
+                    last_study = float(df["study_hours"].iloc[-1]) if len(df) > 0 else 0.0
+                    predicted_study, predicted_score = predict_next(models, exp_sleep, 
+                                                                   study_hours=last_study)
+
+                if predicted_study is not None:
+                    st.success("Prediction Complete")
+                    st.metric("Predicted Study Hours", f"{predicted_study:.1f}h")
+                    st.metric("Predicted Productivity", f"{predicted_score:.1f}")
+
+                    gauge_fig = charts.create_gauge_chart(predicted_score, "Predicted Productivity")
+                    st.plotly_chart(gauge_fig, use_container_width=True)
+                else:
+                    st.error("Prediction failed")
+
+    # Activity heatmap
+    st.divider()
+    st.subheader("Activity Heatmap")
+    heat = activity_heatmap_data(df)
+    if heat.empty:
+        st.info("No activity keywords found")
+    else:
+        st.dataframe(heat, use_container_width=True)
 
 # Sidebar
 with st.sidebar:
@@ -65,16 +230,16 @@ with st.sidebar:
     
     st.divider()
     
-    df = refresh_df()
-    if not df.empty:
+    stats = db_stats()
+    if stats['count']:
         st.subheader("Quick Stats")
         col1, col2 = st.columns(2)
         with col1:
-            st.metric("Total Logs", len(df))
-            st.metric("Avg Sleep", f"{df['sleep_hours'].mean():.1f}h")
+            st.metric("Total Logs", stats['count'])
+            st.metric("Avg Sleep", f"{stats['avg_sleep']:.1f}h")
         with col2:
-            st.metric("Avg Study", f"{df['study_hours'].mean():.1f}h")
-            st.metric("Avg Score", f"{df['productivity_score'].mean():.1f}")
+            st.metric("Avg Study", f"{stats['avg_study']:.1f}h")
+            st.metric("Avg Score", f"{stats['avg_prod']:.1f}")
     
     st.divider()
     st.caption("Built with Streamlit + ML")
@@ -85,9 +250,9 @@ if page == "Dashboard":
     st.title("Smart Habit & Productivity Dashboard")
     st.caption("Transform your daily habits into measurable success")
     
-    df = refresh_df()
+    stats = db_stats()
     
-    if df.empty:
+    if not stats['count']:
         st.info("Welcome! Start by logging your first activity in the Log Activity page.")
         
         col1, col2, col3 = st.columns(3)
@@ -98,28 +263,33 @@ if page == "Dashboard":
         with col3:
             st.info("Get AI Insights\n\nReceive personalized recommendations")
     else:
+        import charts
+        
         # Key Metrics
         st.subheader("Key Performance Indicators")
+        recent_df = recent_logs(7)
+        recent_hash = hash_df(recent_df)
+        last = recent_df.iloc[-1]
         col1, col2, col3, col4 = st.columns(4)
         
         with col1:
-            avg_sleep = df['sleep_hours'].mean()
-            sleep_delta = df['sleep_hours'].iloc[-1] - avg_sleep if len(df) > 1 else None
+            avg_sleep = stats['avg_sleep']
+            sleep_delta = last['sleep_hours'] - avg_sleep if stats['count'] > 1 else None
             create_metric_card("Average Sleep", f"{avg_sleep:.1f}h", 
                              delta=f"{sleep_delta:+.1f}h" if sleep_delta else None)
         
         with col2:
-            avg_study = df['study_hours'].mean()
-            study_delta = df['study_hours'].iloc[-1] - avg_study if len(df) > 1 else None
+            avg_study = stats['avg_study']
+            study_delta = last['study_hours'] - avg_study if stats['count'] > 1 else None
             create_metric_card("Average Study", f"{avg_study:.1f}h",
                              delta=f"{study_delta:+.1f}h" if study_delta else None)
         
         with col3:
-            create_metric_card("Total Logs", len(df))
+            create_metric_card("Total Logs", stats['count'])
         
         with col4:
-            avg_prod = df['productivity_score'].mean()
-            prod_delta = df['productivity_score'].iloc[-1] - avg_prod if len(df) > 1 else None
+            avg_prod = stats['avg_prod']
+            prod_delta = last['productivity_score'] - avg_prod if stats['count'] > 1 else None
             create_metric_card("Productivity", f"{avg_prod:.1f}",
                              delta=f"{prod_delta:+.1f}" if prod_delta else None)
         
@@ -134,84 +304,37 @@ if page == "Dashboard":
             col1, col2 = st.columns(2)
             
             with col1:
-                recent_df = df.tail(7)
-                fig_sleep = go.Figure()
-                fig_sleep.add_trace(go.Scatter(
-                    x=recent_df['date'],
-                    y=recent_df['sleep_hours'],
-                    mode='lines+markers',
-                    line=dict(color='#4F46E5', width=3),
-                    marker=dict(size=8),
-                    fill='tozeroy',
-                    fillcolor='rgba(79, 70, 229, 0.1)',
-                    name='Sleep Hours'
-                ))
-                fig_sleep.update_layout(
-                    title='Sleep Hours Trend',
-                    xaxis_title="Date",
-                    yaxis_title="Hours",
-                    hovermode='x unified',
-                    height=350,
-                    showlegend=False
-                )
+                fig_sleep = charts.create_sleep_trend_chart(recent_hash, recent_df)
                 st.plotly_chart(fig_sleep, use_container_width=True)
             
             with col2:
-                fig_study = go.Figure()
-                fig_study.add_trace(go.Bar(
-                    x=recent_df['date'],
-                    y=recent_df['study_hours'],
-                    marker=dict(
-                        color=recent_df['study_hours'],
-                        colorscale='Purples',
-                        showscale=False
-                    ),
-                    name='Study Hours'
-                ))
-                fig_study.update_layout(
-                    title='Study Hours Trend',
-                    xaxis_title="Date",
-                    yaxis_title="Hours",
-                    height=350,
-                    showlegend=False
-                )
+                fig_study = charts.create_study_bar_chart(recent_hash, recent_df)
                 st.plotly_chart(fig_study, use_container_width=True)
         
         with tab2:
-            recent_df = df.tail(7)
-            
-            fig_prod = go.Figure()
-            fig_prod.add_trace(go.Scatter(
-                x=recent_df['date'],
-                y=recent_df['productivity_score'],
-                mode='lines+markers',
-                line=dict(color='#10B981', width=3),
-                marker=dict(size=8),
-                fill='tozeroy',
-                fillcolor='rgba(16, 185, 129, 0.1)',
-                name='Productivity'
-            ))
-            fig_prod.update_layout(
-                title='Productivity Score Trend',
-                xaxis_title="Date",
-                yaxis_title="Score",
-                hovermode='x unified',
-                height=350,
-                showlegend=False
-            )
+            fig_prod = charts.create_productivity_trend_chart(recent_hash, recent_df)
             st.plotly_chart(fig_prod, use_container_width=True)
             
             col1, col2, col3 = st.columns([1, 2, 1])
             with col2:
-                current_score = df['productivity_score'].iloc[-1]
-                gauge_fig = create_gauge_chart(current_score, "Current Productivity Score")
+                current_score = last['productivity_score']
+                gauge_fig = charts.create_gauge_chart(current_score, "Current Productivity Score")
                 st.plotly_chart(gauge_fig, use_container_width=True)
         
         with tab3:
             st.subheader("Recent Activity Log")
-            display_df = df.tail(7)[['date', 'sleep_hours', 'study_hours', 'activities', 'mood']].copy()
-            display_df.columns = ['Date', 'Sleep', 'Study', 'Activities', 'Mood']
-            st.dataframe(display_df, use_container_width=True, hide_index=True)
+            display_df = recent_df[['date', 'sleep_hours', 'study_hours', 'activities', 'mood']].rename(
+                columns={'date': 'Date', 'sleep_hours': 'Sleep', 'study_hours': 'Study',
+                         'activities': 'Activities', 'mood': 'Mood'})
+            st.dataframe(
+                display_df,
+                use_container_width=True,
+                hide_index=True,
+                column_config={
+                    "Sleep": st.column_config.NumberColumn("Sleep", format="%.1f"),
+                    "Study": st.column_config.NumberColumn("Study", format="%.1f"),
+                }
+            )
 
 # Log Activity Page
 elif page == "Log Activity":
@@ -225,7 +348,7 @@ elif page == "Log Activity":
             st.subheader("Basic Info")
             date = st.date_input("Date", value=datetime.today())
             mode = st.selectbox("Role", ["student", "employee"])
-            mood = st.selectbox("Mood", ["", "happy", "good", "ok", "tired", "stressed"])
+            mood = st.selectbox("Mood", MOODS)
         
         with col2:
             st.subheader("Time Tracking")
@@ -267,6 +390,7 @@ elif page == "Log Activity":
                       mood=mood, notes=notes, mode=mode, water_intake=water, steps=steps,
                       screen_time_minutes=screen_time, productivity_score=prod_score)
             
+            st.cache_data.clear()
             st.success(f"Activity logged successfully! Productivity Score: {prod_score}")
             st.balloons()
             st.rerun()
@@ -284,10 +408,20 @@ elif page == "Edit Logs":
         st.subheader("Your Activity History")
         
         display_df = df[["id", "date", "sleep_hours", "study_hours", "mood", 
-                        "productivity_score"]].tail(50).copy()
-        display_df.columns = ["ID", "Date", "Sleep", "Study", "Mood", "Score"]
+                        "productivity_score"]].tail(50).rename(
+            columns={"id": "ID", "date": "Date", "sleep_hours": "Sleep", "study_hours": "Study",
+                     "mood": "Mood", "productivity_score": "Score"})
         
-        st.dataframe(display_df, use_container_width=True, hide_index=True)
+        st.dataframe(
+            display_df,
+            use_container_width=True,
+            hide_index=True,
+            column_config={
+                "Sleep": st.column_config.NumberColumn("Sleep", format="%.1f"),
+                "Study": st.column_config.NumberColumn("Study", format="%.1f"),
+                "Score": st.column_config.NumberColumn("Score", format="%.2f"),
+            }
+        )
         
         st.divider()
         st.subheader("Edit Selected Log")
@@ -310,8 +444,7 @@ elif page == "Edit Logs":
                 
                 with col1:
                     new_sleep = st.number_input("Sleep Hours", value=float(sleep_hours))
-                    new_mood = st.selectbox("Mood", ["", "happy", "good", "ok", "tired", "stressed"],
-                                           index=["", "happy", "good", "ok", "tired", "stressed"].index(mood) if mood else 0)
+                    new_mood = st.selectbox("Mood", MOODS, index=MOOD_IDX.get(mood, 0))
                 
                 with col2:
                     new_study = st.number_input("Study Hours", value=float(study_hours))
@@ -342,6 +475,7 @@ elif page == "Edit Logs":
                              notes=new_notes,
                              mode=new_mode,
                              productivity_score=new_prod_score)
+                    st.cache_data.clear()
                     
                     st.success(f"Log updated successfully! New Score: {new_prod_score}")
                     st.rerun()
@@ -358,26 +492,30 @@ elif page == "Analytics":
     if df.empty:
         st.warning("Need data to generate analytics. Start logging your activities!")
     else:
+        h = hash_df(df)
+        last = df.iloc[-1]
+        
         # Summary Statistics
         st.subheader("Statistical Summary")
+        stats = _summary_stats(h, df)
         col1, col2, col3, col4 = st.columns(4)
         
         with col1:
-            create_metric_card("Average Sleep", f"{df['sleep_hours'].mean():.2f}h")
-            create_metric_card("Sleep StdDev", f"{df['sleep_hours'].std():.2f}h")
+            create_metric_card("Average Sleep", f"{stats['sleep_mean']:.2f}h")
+            create_metric_card("Sleep StdDev", f"{stats['sleep_std']:.2f}h")
         
         with col2:
-            create_metric_card("Average Study", f"{df['study_hours'].mean():.2f}h")
-            create_metric_card("Study StdDev", f"{df['study_hours'].std():.2f}h")
+            create_metric_card("Average Study", f"{stats['study_mean']:.2f}h")
+            create_metric_card("Study StdDev", f"{stats['study_std']:.2f}h")
         
         with col3:
-            create_metric_card("Avg Productivity", f"{df['productivity_score'].mean():.2f}")
-            create_metric_card("Score StdDev", f"{df['productivity_score'].std():.2f}")
+            create_metric_card("Avg Productivity", f"{stats['prod_mean']:.2f}")
+            create_metric_card("Score StdDev", f"{stats['prod_std']:.2f}")
         
         with col4:
             create_metric_card("Total Days", len(df))
             if len(df) > 1:
-                date_range = (pd.to_datetime(df['date'].iloc[-1]) - pd.to_datetime(df['date'].iloc[0])).days
+                date_range = (last['date'] - df['date'].iloc[0]).days
                 create_metric_card("Date Range", f"{date_range} days")
         
         st.divider()
@@ -386,277 +524,16 @@ elif page == "Analytics":
         tab1, tab2, tab3, tab4 = st.tabs(["Trends", "Distributions", "Correlations", "ML Insights"])
         
         with tab1:
-            st.subheader("Long-term Trends")
-            
-            # Combined trend chart
-            fig = go.Figure()
-            fig.add_trace(go.Scatter(
-                x=df['date'], 
-                y=df['sleep_hours'],
-                mode='lines+markers', 
-                name='Sleep Hours',
-                line=dict(color='#4F46E5', width=2),
-                marker=dict(size=6)
-            ))
-            fig.add_trace(go.Scatter(
-                x=df['date'], 
-                y=df['study_hours'],
-                mode='lines+markers', 
-                name='Study Hours',
-                line=dict(color='#7C3AED', width=2),
-                marker=dict(size=6)
-            ))
-            fig.add_trace(go.Scatter(
-                x=df['date'], 
-                y=df['productivity_score'],
-                mode='lines+markers', 
-                name='Productivity',
-                line=dict(color='#10B981', width=2),
-                marker=dict(size=6)
-            ))
-            
-            fig.update_layout(
-                title="All Metrics Over Time",
-                xaxis_title="Date",
-                yaxis_title="Value",
-                hovermode='x unified',
-                height=400,
-                legend=dict(orientation="h", yanchor="bottom", y=1.02, xanchor="right", x=1)
-            )
-            st.plotly_chart(fig, use_container_width=True)
-            
-            # Moving averages
-            col1, col2 = st.columns(2)
-            with col1:
-                window = st.slider("Moving Average Window", 3, 14, 7)
-            
-            df['sleep_ma'] = df['sleep_hours'].rolling(window=window).mean()
-            df['study_ma'] = df['study_hours'].rolling(window=window).mean()
-            
-            fig_ma = go.Figure()
-            fig_ma.add_trace(go.Scatter(
-                x=df['date'], 
-                y=df['sleep_ma'],
-                mode='lines', 
-                name=f'{window}-Day Avg Sleep',
-                line=dict(color='#4F46E5', width=3)
-            ))
-            fig_ma.add_trace(go.Scatter(
-                x=df['date'], 
-                y=df['study_ma'],
-                mode='lines', 
-                name=f'{window}-Day Avg Study',
-                line=dict(color='#7C3AED', width=3)
-            ))
-            
-            fig_ma.update_layout(
-                title=f"{window}-Day Moving Average",
-                xaxis_title="Date",
-                yaxis_title="Hours",
-                height=350
-            )
-            st.plotly_chart(fig_ma, use_container_width=True)
+            _trends_tab(df, h)
         
         with tab2:
-            st.subheader("Distribution Analysis")
-            
-            col1, col2 = st.columns(2)
-            
-            with col1:
-                fig_sleep_dist = go.Figure()
-                fig_sleep_dist.add_trace(go.Histogram(
-                    x=df['sleep_hours'],
-                    nbinsx=20,
-                    marker=dict(color='#4F46E5', line=dict(color='white', width=1)),
-                    name='Sleep Hours'
-                ))
-                fig_sleep_dist.update_layout(
-                    title='Sleep Hours Distribution',
-                    xaxis_title="Sleep Hours",
-                    yaxis_title="Frequency",
-                    showlegend=False
-                )
-                st.plotly_chart(fig_sleep_dist, use_container_width=True)
-            
-            with col2:
-                fig_study_dist = go.Figure()
-                fig_study_dist.add_trace(go.Histogram(
-                    x=df['study_hours'],
-                    nbinsx=20,
-                    marker=dict(color='#7C3AED', line=dict(color='white', width=1)),
-                    name='Study Hours'
-                ))
-                fig_study_dist.update_layout(
-                    title='Study Hours Distribution',
-                    xaxis_title="Study Hours",
-                    yaxis_title="Frequency",
-                    showlegend=False
-                )
-                st.plotly_chart(fig_study_dist, use_container_width=True)
-            
-            # Box plots and Mood Distribution
-            col1, col2 = st.columns(2)
-            
-            with col1:
-                fig_box = go.Figure()
-                fig_box.add_trace(go.Box(y=df['sleep_hours'], name='Sleep', marker_color='#4F46E5'))
-                fig_box.add_trace(go.Box(y=df['study_hours'], name='Study', marker_color='#7C3AED'))
-                fig_box.add_trace(go.Box(y=df['productivity_score'], name='Productivity', marker_color='#10B981'))
-                fig_box.update_layout(
-                    title='Value Distributions (Box Plot)',
-                    yaxis_title="Value",
-                    showlegend=True
-                )
-                st.plotly_chart(fig_box, use_container_width=True)
-            
-            with col2:
-                if 'mood' in df.columns and df['mood'].notna().any():
-                    mood_counts = df['mood'].value_counts()
-                    fig_mood = go.Figure()
-                    fig_mood.add_trace(go.Pie(
-                        labels=mood_counts.index,
-                        values=mood_counts.values,
-                        hole=0.4,
-                        marker=dict(colors=['#10B981', '#4F46E5', '#F59E0B', '#EF4444', '#7C3AED'])
-                    ))
-                    fig_mood.update_layout(
-                        title='Mood Distribution',
-                        showlegend=True
-                    )
-                    st.plotly_chart(fig_mood, use_container_width=True)
+            _distributions_tab(df, h)
         
         with tab3:
-            st.subheader("Correlation Analysis")
-            
-            # Scatter plot
-            fig_scatter = go.Figure()
-            fig_scatter.add_trace(go.Scatter(
-                x=df['sleep_hours'],
-                y=df['study_hours'],
-                mode='markers',
-                marker=dict(
-                    size=df['productivity_score']*3,
-                    color=df['productivity_score'],
-                    colorscale='Viridis',
-                    showscale=True,
-                    colorbar=dict(title="Productivity")
-                ),
-                text=df['date'],
-                hovertemplate='<b>Date:</b> %{text}<br><b>Sleep:</b> %{x}h<br><b>Study:</b> %{y}h<extra></extra>'
-            ))
-            fig_scatter.update_layout(
-                title='Sleep vs Study Hours (sized by Productivity)',
-                xaxis_title="Sleep Hours",
-                yaxis_title="Study Hours",
-                height=400
-            )
-            st.plotly_chart(fig_scatter, use_container_width=True)
-            
-            # Correlation heatmap
-            corr_cols = ['sleep_hours', 'study_hours', 'productivity_score']
-            if 'water_intake' in df.columns:
-                corr_cols.append('water_intake')
-            if 'steps' in df.columns:
-                corr_cols.append('steps')
-            
-            corr_matrix = df[corr_cols].corr()
-            
-            fig_heatmap = go.Figure()
-            fig_heatmap.add_trace(go.Heatmap(
-                z=corr_matrix.values,
-                x=corr_matrix.columns,
-                y=corr_matrix.columns,
-                colorscale='RdBu_r',
-                zmid=0,
-                text=corr_matrix.values.round(2),
-                texttemplate='%{text}',
-                textfont={"size": 10},
-                colorbar=dict(title="Correlation")
-            ))
-            fig_heatmap.update_layout(
-                title='Correlation Heatmap',
-                height=400
-            )
-            st.plotly_chart(fig_heatmap, use_container_width=True)
+            _correlations_tab(df, h)
         
         with tab4:
-            st.subheader("Machine Learning Insights")
-            
-            col1, col2 = st.columns(2)
-            
-            with col1:
-                st.markdown("##### K-Means Clustering")
-                with st.spinner("Running clustering algorithm..."):
-                    clusters, km_model, cluster_err = get_clusters(df)
-                
-                if cluster_err:
-                    st.warning(f"{cluster_err}")
-                else:
-                    df_cluster = df.copy()
-                    df_cluster['Cluster'] = clusters
-                    
-                    fig_cluster = go.Figure()
-                    
-                    for cluster in df_cluster['Cluster'].unique():
-                        cluster_data = df_cluster[df_cluster['Cluster'] == cluster]
-                        fig_cluster.add_trace(go.Scatter(
-                            x=cluster_data['sleep_hours'],
-                            y=cluster_data['study_hours'],
-                            mode='markers',
-                            name=cluster,
-                            marker=dict(
-                                size=cluster_data['productivity_score']*2,
-                                line=dict(width=1, color='white')
-                            ),
-                            text=cluster_data['date'],
-                            hovertemplate='<b>Date:</b> %{text}<br><b>Pattern:</b> ' + cluster + '<extra></extra>'
-                        ))
-                    
-                    fig_cluster.update_layout(
-                        title='Productivity Patterns (K-Means)',
-                        xaxis_title="Sleep Hours",
-                        yaxis_title="Study Hours",
-                        height=400
-                    )
-                    st.plotly_chart(fig_cluster, use_container_width=True)
-                    
-                    st.info(f"Identified {len(set(clusters))} distinct patterns in your habits")
-            
-            with col2:
-                st.markdown("##### Predictive Analytics")
-                models, reg_err = train_regression(df)
-                
-                if reg_err:
-                    st.warning(f"{reg_err}")
-                else:
-                    exp_sleep = st.slider("Expected sleep hours tomorrow",
-                                        min_value=0.0, max_value=12.0,
-                                        value=7.0, step=0.5)
-                    
-                    if st.button("Generate Prediction", use_container_width=True):
-                        with st.spinner("Calculating prediction..."):
-                            last_study = float(df["study_hours"].iloc[-1]) if len(df) > 0 else 0.0
-                            predicted_study, predicted_score = predict_next(models, exp_sleep, 
-                                                                           study_hours=last_study)
-                        
-                        if predicted_study is not None:
-                            st.success("Prediction Complete")
-                            st.metric("Predicted Study Hours", f"{predicted_study:.1f}h")
-                            st.metric("Predicted Productivity", f"{predicted_score:.1f}")
-                            
-                            gauge_fig = create_gauge_chart(predicted_score, "Predicted Productivity")
-                            st.plotly_chart(gauge_fig, use_container_width=True)
-                        else:
-                            st.error("Prediction failed")
-            
-            # Activity heatmap
-            st.divider()
-            st.subheader("Activity Heatmap")
-            heat = activity_heatmap_data(df)
-            if heat.empty:
-                st.info("No activity keywords found")
-            else:
-                st.dataframe(heat, use_container_width=True)
+            _ml_tab(df, h)
 
 # AI Insights Page
 elif page == "AI Insights":
@@ -671,24 +548,25 @@ elif page == "AI Insights":
         if not ENABLE_AI:
             st.info("AI features are disabled. Enable ENABLE_AI in config.py to use this feature.")
         else:
+            from recommendations import get_gemini_reco_stream
+            
             st.info("AI will analyze your habit patterns and provide personalized recommendations")
             
             col1, col2, col3 = st.columns([1, 2, 1])
             with col2:
                 if st.button("Generate AI Recommendations", use_container_width=True, type="primary"):
-                    with st.spinner("AI is analyzing your data... This may take a moment"):
-                        try:
-                            reco = get_gemini_reco(df, mode="student")
-                            
-                            st.success("AI Analysis Complete!")
-                            st.divider()
-                            
-                            st.subheader("Your Personalized Recommendations")
-                            st.markdown(reco)
-                            
-                        except Exception as e:
-                            st.error(f"AI Error: {e}")
-                            st.info("Please check your API configuration in config.py")
+                    try:
+                        st.divider()
+                        st.subheader("Your Personalized Recommendations")
+                        # tips render as they stream in rather than after the full answer
+                        with st.spinner("AI is analyzing your data... This may take a moment"):
+                            st.write_stream(get_gemini_reco_stream(df, mode="student"))
+                        
+                        st.success("AI Analysis Complete!")
+                        
+                    except Exception as e:
+                        st.error(f"AI Error: {e}")
+                        st.info("Please check your API configuration in config.py")
 
 # Export Page
 elif page == "Export":
@@ -705,16 +583,17 @@ elif page == "Export":
         st.markdown("#### CSV Export")
         st.write("Download your complete activity log as CSV")
         
-        if st.button("Export to CSV", use_container_width=True, type="primary"):
-            path = export_csv("habit_export.csv")
-            with open(path, "rb") as f:
-                st.download_button(
-                    label="Download CSV File",
-                    data=f,
-                    file_name=f"habit_tracker_{datetime.now().strftime('%Y%m%d')}.csv",
-                    mime="text/csv",
-                    use_container_width=True
-                )
+        if df.empty:
+            st.info("No data available")
+        else:
+            st.download_button(
+                label="Download CSV File",
+                data=_csv_bytes(hash_df(df), df),
+                file_name=f"habit_tracker_{datetime.now().strftime('%Y%m%d')}.csv",
+                mime="text/csv",
+                use_container_width=True,
+                type="primary"
+            )
     
     with col2:
         st.markdown("#### PDF Report")
@@ -723,6 +602,7 @@ elif page == "Export":
             
             if st.button("Generate PDF", use_container_width=True, type="primary"):
                 try:
+                    import export_utils
                     with st.spinner("Generating PDF report..."):
                         pdf_path = export_utils.generate_pdf_report("habit_report.pdf")
                     
@@ -747,26 +627,31 @@ elif page == "Export":
     if df.empty:
         st.info("No data available")
     else:
-        # Summary stats
+        # Summary stats (date is already datetime64 from get_dataframe)
+        dates = df['date']
+        avg_prod = df['productivity_score'].mean()
         col1, col2, col3, col4 = st.columns(4)
         with col1:
             st.metric("Total Records", len(df))
         with col2:
-            st.metric("Date Range", f"{(pd.to_datetime(df['date'].iloc[-1]) - pd.to_datetime(df['date'].iloc[0])).days} days")
+            st.metric("Date Range", f"{(dates.iloc[-1] - dates.iloc[0]).days} days")
         with col3:
-            st.metric("Avg Productivity", f"{df['productivity_score'].mean():.1f}")
+            st.metric("Avg Productivity", f"{avg_prod:.1f}")
         with col4:
-            st.metric("Data Completeness", f"{(df.notna().sum().sum() / df.size * 100):.0f}%")
+            # numeric columns as one float block; a single isnan pass covers them
+            arr = df.select_dtypes(include=[np.number]).to_numpy(dtype=np.float64, na_value=np.nan)
+            st.metric("Data Completeness", f"{np.count_nonzero(~np.isnan(arr)) / arr.size * 100:.0f}%")
         
         st.divider()
         
-        # Full data table
-        display_df = df[['date', 'sleep_hours', 'study_hours', 'productivity_score', 
-                        'mood', 'activities']].copy()
-        display_df.columns = ['Date', 'Sleep (h)', 'Study (h)', 'Score', 'Mood', 'Activities']
+        # Latest rows only; the limit is applied in SQL
+        display_df = recent_logs(50)[['date', 'sleep_hours', 'study_hours', 'productivity_score', 
+                        'mood', 'activities']].rename(
+            columns={'date': 'Date', 'sleep_hours': 'Sleep (h)', 'study_hours': 'Study (h)',
+                     'productivity_score': 'Score', 'mood': 'Mood', 'activities': 'Activities'})
         
         st.dataframe(
-            display_df.tail(50),
+            display_df,
             use_container_width=True,
             hide_index=True,
             column_config={
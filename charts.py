@@ -0,0 +1,286 @@
+# charts.py
+"""Plotly figure factories for the Streamlit pages.
+
+Each factory is cached with st.cache_data. The first argument is a content
+hash of the data (see app.hash_df) and the frames themselves are passed as
+underscore arguments so Streamlit does not re-hash them on every rerun.
+"""
+import plotly.graph_objects as go
+import streamlit as st
+from data_processing import m4_downsample
+
+
+@st.cache_data
+def create_gauge_chart(value, title, max_value=10):
+    fig = go.Figure(go.Indicator(
+        mode="gauge+number",
+        value=value,
+        domain={'x': [0, 1], 'y': [0, 1]},
+        title={'text': title, 'font': {'size': 18}},
+        gauge={
+            'axis': {'range': [None, max_value], 'tickwidth': 1},
+            'bar': {'color': "#4F46E5"},
+            'bgcolor': "white",
+            'borderwidth': 2,
+            'bordercolor': "#E5E7EB",
+            'steps': [
+                {'range': [0, max_value*0.33], 'color': '#FEF3C7'},
+                {'range': [max_value*0.33, max_value*0.66], 'color': '#DDD6FE'},
+                {'range': [max_value*0.66, max_value], 'color': '#D1FAE5'}
+            ],
+        }
+    ))
+    fig.update_layout(height=250, margin=dict(l=20, r=20, t=50, b=20))
+    return fig
+
+
+# Dashboard
+
+@st.cache_data
+def create_sleep_trend_chart(df_hash, _recent_df):
+    fig = go.Figure()
+    fig.add_trace(go.Scatter(
+        x=_recent_df['date'],
+        y=_recent_df['sleep_hours'],
+        mode='lines+markers',
+        line=dict(color='#4F46E5', width=3),
+        marker=dict(size=8),
+        fill='tozeroy',
+        fillcolor='rgba(79, 70, 229, 0.1)',
+        name='Sleep Hours'
+    ))
+    fig.update_layout(
+        title='Sleep Hours Trend',
+        xaxis_title="Date",
+        yaxis_title="Hours",
+        hovermode='x unified',
+        height=350,
+        showlegend=False
+    )
+    return fig
+
+
+@st.cache_data
+def create_study_bar_chart(df_hash, _recent_df):
+    fig = go.Figure()
+    fig.add_trace(go.Bar(
+        x=_recent_df['date'],
+        y=_recent_df['study_hours'],
+        marker=dict(
+            color=_recent_df['study_hours'],
+            colorscale='Purples',
+            showscale=False
+        ),
+        name='Study Hours'
+    ))
+    fig.update_layout(
+        title='Study Hours Trend',
+        xaxis_title="Date",
+        yaxis_title="Hours",
+        height=350,
+        showlegend=False
+    )
+    return fig
+
+
+@st.cache_data
+def create_productivity_trend_chart(df_hash, _recent_df):
+    fig = go.Figure()
+    fig.add_trace(go.Scatter(
+        x=_recent_df['date'],
+        y=_recent_df['productivity_score'],
+        mode='lines+markers',
+        line=dict(color='#10B981', width=3),
+        marker=dict(size=8),
+        fill='tozeroy',
+        fillcolor='rgba(16, 185, 129, 0.1)',
+        name='Productivity'
+    ))
+    fig.update_layout(
+        title='Productivity Score Trend',
+        xaxis_title="Date",
+        yaxis_title="Score",
+        hovermode='x unified',
+        height=350,
+        showlegend=False
+    )
+    return fig
+
+
+# Analytics
+
+@st.cache_data
+def create_metrics_over_time_chart(df_hash, _df):
+    # M4-downsampled so long histories don't ship every row to the browser
+    fig = go.Figure()
+    for col, name, color in [('sleep_hours', 'Sleep Hours', '#4F46E5'),
+                             ('study_hours', 'Study Hours', '#7C3AED'),
+                             ('productivity_score', 'Productivity', '#10B981')]:
+        idx = m4_downsample(_df['date'], _df[col])
+        fig.add_trace(go.Scatter(
+            x=_df['date'].iloc[idx],
+            y=_df[col].iloc[idx],
+            mode='lines+markers',
+            name=name,
+            line=dict(color=color, width=2),
+            marker=dict(size=6)
+        ))
+    fig.update_layout(
+        title="All Metrics Over Time",
+        xaxis_title="Date",
+        yaxis_title="Value",
+        hovermode='x unified',
+        height=400,
+        legend=dict(orientation="h", yanchor="bottom", y=1.02, xanchor="right", x=1)
+    )
+    return fig
+
+
+@st.cache_data
+def create_moving_average_chart(df_hash, _dates, _ma, window):
+    fig = go.Figure()
+    fig.add_trace(go.Scatter(
+        x=_dates,
+        y=_ma['sleep_ma'],
+        mode='lines',
+        name=f'{window}-Day Avg Sleep',
+        line=dict(color='#4F46E5', width=3)
+    ))
+    fig.add_trace(go.Scatter(
+        x=_dates,
+        y=_ma['study_ma'],
+        mode='lines',
+        name=f'{window}-Day Avg Study',
+        line=dict(color='#7C3AED', width=3)
+    ))
+    fig.update_layout(
+        title=f"{window}-Day Moving Average",
+        xaxis_title="Date",
+        yaxis_title="Hours",
+        height=350
+    )
+    return fig
+
+
+@st.cache_data
+def create_histogram(df_hash, _df, column, title, axis_title, color):
+    fig = go.Figure()
+    fig.add_trace(go.Histogram(
+        x=_df[column],
+        nbinsx=20,
+        marker=dict(color=color, line=dict(color='white', width=1)),
+        name=axis_title
+    ))
+    fig.update_layout(
+        title=title,
+        xaxis_title=axis_title,
+        yaxis_title="Frequency",
+        showlegend=False
+    )
+    return fig
+
+
+@st.cache_data
+def create_box_plot(df_hash, _df):
+    fig = go.Figure()
+    fig.add_trace(go.Box(y=_df['sleep_hours'], name='Sleep', marker_color='#4F46E5'))
+    fig.add_trace(go.Box(y=_df['study_hours'], name='Study', marker_color='#7C3AED'))
+    fig.add_trace(go.Box(y=_df['productivity_score'], name='Productivity', marker_color='#10B981'))
+    fig.update_layout(
+        title='Value Distributions (Box Plot)',
+        yaxis_title="Value",
+        showlegend=True
+    )
+    return fig
+
+
+@st.cache_data
+def create_mood_pie_chart(df_hash, _df):
+    mood_counts = _df['mood'].value_counts()
+    fig = go.Figure()
+    fig.add_trace(go.Pie(
+        labels=mood_counts.index,
+        values=mood_counts.values,
+        hole=0.4,
+        marker=dict(colors=['#10B981', '#4F46E5', '#F59E0B', '#EF4444', '#7C3AED'])
+    ))
+    fig.update_layout(
+        title='Mood Distribution',
+        showlegend=True
+    )
+    return fig
+
+
+@st.cache_data
+def create_sleep_study_scatter(df_hash, _df):
+    fig = go.Figure()
+    fig.add_trace(go.Scatter(
+        x=_df['sleep_hours'],
+        y=_df['study_hours'],
+        mode='markers',
+        marker=dict(
+            size=_df['productivity_score']*3,
+            color=_df['productivity_score'],
+            colorscale='Viridis',
+            showscale=True,
+            colorbar=dict(title="Productivity")
+        ),
+        text=_df['date'],
+        hovertemplate='<b>Date:</b> %{text}<br><b>Sleep:</b> %{x}h<br><b>Study:</b> %{y}h<extra></extra>'
+    ))
+    fig.update_layout(
+        title='Sleep vs Study Hours (sized by Productivity)',
+        xaxis_title="Sleep Hours",
+        yaxis_title="Study Hours",
+        height=400
+    )
+    return fig
+
+
+@st.cache_data
+def create_correlation_heatmap(df_hash, _corr_matrix):
+    fig = go.Figure()
+    fig.add_trace(go.Heatmap(
+        z=_corr_matrix.values,
+        x=_corr_matrix.columns,
+        y=_corr_matrix.columns,
+        colorscale='RdBu_r',
+        zmid=0,
+        text=_corr_matrix.values.round(2),
+        texttemplate='%{text}',
+        textfont={"size": 10},
+        colorbar=dict(title="Correlation")
+    ))
+    fig.update_layout(
+        title='Correlation Heatmap',
+        height=400
+    )
+    return fig
+
+
+@st.cache_data
+def create_cluster_chart(df_hash, _df_cluster):
+    fig = go.Figure()
+
+    # single groupby pass instead of one boolean mask per cluster
+    for cluster, cluster_data in _df_cluster.groupby('Cluster', sort=False, observed=True):
+        fig.add_trace(go.Scatter(
+            x=cluster_data['sleep_hours'],
+            y=cluster_data['study_hours'],
+            mode='markers',
+            name=cluster,
+            marker=dict(
+                size=cluster_data['productivity_score']*2,
+                line=dict(width=1, color='white')
+            ),
+            text=cluster_data['date'],
+            hovertemplate='<b>Date:</b> %{text}<br><b>Pattern:</b> ' + cluster + '<extra></extra>'
+        ))
+
+    fig.update_layout(
+        title='Productivity Patterns (K-Means)',
+        xaxis_title="Sleep Hours",
+        yaxis_title="Study Hours",
+        height=400
+    )
+    return fig
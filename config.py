@@ -2,6 +2,8 @@
 # config.py
 
 import os
+from dataclasses import dataclass
+from functools import lru_cache
 from dotenv import load_dotenv
 
 # Try Streamlit secrets (only available in deployment)
@@ -11,39 +13,72 @@ try:
 except:
     USE_STREAMLIT = False
 
-# 1. LOAD FROM STREAMLIT SECRETS (DEPLOYED MODE)
 
-if USE_STREAMLIT and hasattr(st, "secrets") and "GEMINI_API_KEY" in st.secrets:
-    DB_NAME = st.secrets.get("DB_NAME", "habits.db")
+@dataclass(frozen=True, slots=True)
+class Config:
+    DB_NAME: str
+    GEMINI_API_KEY: str
+    GEMINI_MODEL: str
+    ENABLE_AI: bool
+    ENABLE_PDF_EXPORT: bool
 
-    GEMINI_API_KEY = st.secrets["GEMINI_API_KEY"]
-    GEMINI_MODEL = st.secrets.get("GEMINI_MODEL", "gemini-2.5-flash")
 
-    ENABLE_AI = str(st.secrets.get("ENABLE_AI", "true")).lower() == "true"
-    ENABLE_PDF_EXPORT = str(st.secrets.get("ENABLE_PDF_EXPORT", "true")).lower() == "true"
+def _bool_env(name: str, default: bool = False) -> bool:
+    v = os.getenv(name)
+    if v is None:
+        return default
+    return str(v).lower() in ("1", "true", "yes", "on")
 
-else:
 
-    # 2. FALLBACK: LOCAL .env FILE (DEV MODE)
- 
-    load_dotenv()
+def _has_secrets() -> bool:
+    # st.secrets raises when no secrets.toml exists; treat that as local mode
+    try:
+        return USE_STREAMLIT and hasattr(st, "secrets") and "GEMINI_API_KEY" in st.secrets
+    except Exception:
+        return False
 
-    DB_NAME = os.getenv("DB_NAME", "habits.db")
-    GEMINI_API_KEY = os.getenv("GEMINI_API_KEY", "")
-    GEMINI_MODEL = os.getenv("GEMINI_MODEL", "gemini-2.5-flash")
 
-    def _bool_env(name: str, default: bool = False) -> bool:
-        v = os.getenv(name)
-        if v is None:
-            return default
-        return str(v).lower() in ("1", "true", "yes", "on")
+@lru_cache(maxsize=1)
+def _load() -> Config:
+    """Resolve settings once per process; .env is only read on the first call."""
 
-    ENABLE_AI = _bool_env("ENABLE_AI", True)
-    ENABLE_PDF_EXPORT = _bool_env("ENABLE_PDF_EXPORT", True)
+    # 1. LOAD FROM STREAMLIT SECRETS (DEPLOYED MODE)
 
-# If no API key, disable AI safely
-if not GEMINI_API_KEY:
-    ENABLE_AI = False
+    if _has_secrets():
+        db_name = st.secrets.get("DB_NAME", "habits.db")
+
+        api_key = st.secrets["GEMINI_API_KEY"]
+        model = st.secrets.get("GEMINI_MODEL", "gemini-2.5-flash")
+
+        enable_ai = str(st.secrets.get("ENABLE_AI", "true")).lower() == "true"
+        enable_pdf = str(st.secrets.get("ENABLE_PDF_EXPORT", "true")).lower() == "true"
+
+    else:
+
+        # 2. FALLBACK: LOCAL .env FILE (DEV MODE)
+
+        load_dotenv()
+
+        db_name = os.getenv("DB_NAME", "habits.db")
+        api_key = os.getenv("GEMINI_API_KEY", "")
+        model = os.getenv("GEMINI_MODEL", "gemini-2.5-flash")
+
+        enable_ai = _bool_env("ENABLE_AI", True)
+        enable_pdf = _bool_env("ENABLE_PDF_EXPORT", True)
+
+    # If no API key, disable AI safely
+    return Config(DB_NAME=db_name, GEMINI_API_KEY=api_key, GEMINI_MODEL=model,
+                  ENABLE_AI=enable_ai and bool(api_key), ENABLE_PDF_EXPORT=enable_pdf)
+
+
+CONFIG = _load()
+
+# module-level names kept for existing `from config import ...` users
+DB_NAME = CONFIG.DB_NAME
+GEMINI_API_KEY = CONFIG.GEMINI_API_KEY
+GEMINI_MODEL = CONFIG.GEMINI_MODEL
+ENABLE_AI = CONFIG.ENABLE_AI
+ENABLE_PDF_EXPORT = CONFIG.ENABLE_PDF_EXPORT
 
 
 
@@ -1,88 +1,179 @@
+import re
 import pandas as pd
 import numpy as np
+import streamlit as st
 from datetime import datetime
-from database import fetch_logs
+from database import fetch_logs_df, fetch_recent_logs_df, fetch_cols_df, get_db_mtime
 from typing import Tuple
 
-def compute_productivity_score(row):
+_MOOD_SET = frozenset({"good", "great", "happy", "energized"})
+_FILL_ZERO = ("sleep_hours", "study_hours")
+_PERIOD_AGG = {
+    "sleep_hours": ("sleep_hours", "mean"),
+    "study_hours": ("study_hours", "sum"),
+    "productivity_score": ("productivity_score", "mean"),
+}
+_ACTIVITY_SEP = re.compile(r"\s*[,;]\s*")
+_WEEKDAYS = ("Monday", "Tuesday", "Wednesday", "Thursday", "Friday", "Saturday", "Sunday")
 
+def _prod_score_kernel(sleep, study, mood_score):
+    # works on scalars and numpy arrays alike
     # normalize study_hours to 0-10 scale (assume 0-12 hours)
-    study = min(row.get("study_hours", 0), 12) / 12 * 10
+    study = np.minimum(study, 12) / 12 * 10
     # normalize sleep: ideal ~7-8 hrs
-    sleep = row.get("sleep_hours", 0)
-    sleep_score = max(0, 10 - abs(7.5 - sleep) * 1.5)  # small penalty for deviating from 7.5h
+    sleep_score = np.maximum(0, 10 - np.abs(7.5 - sleep) * 1.5)  # small penalty for deviating from 7.5h
+    # simple weighted sum
+    return 0.6 * study + 0.35 * sleep_score + 2.0 * mood_score
+
+def compute_productivity_score(row):
     # mood bonus
     mood = row.get("mood", "")
-    mood_score = 1.0 if mood and mood.lower() in ("good", "great", "happy", "energized") else 0.0
-    # simple weighted sum
-    score = 0.6 * study + 0.35 * sleep_score + 2.0 * mood_score
-    return round(score, 2)
+    mood_score = 1.0 if mood and mood.lower() in _MOOD_SET else 0.0
+    score = _prod_score_kernel(row.get("sleep_hours", 0), row.get("study_hours", 0), mood_score)
+    return round(float(score), 2)
+
+def compute_productivity_score_bulk(sleep_hours, study_hours, moods):
+    """
+    Vectorised compute_productivity_score for backfills / recomputes.
+    Takes equal-length array-likes and returns a float ndarray.
+    """
+    sleep = np.asarray(sleep_hours, dtype=float)
+    study = np.asarray(study_hours, dtype=float)
+    mood_score = _positive_mood_flags(moods)
+    return np.round(_prod_score_kernel(sleep, study, mood_score), 2)
+
+def _positive_mood_flags(moods):
+    # 1.0 where the mood is positive, NaN/None count as neutral
+    moods = pd.Series(moods)
+    if isinstance(moods.dtype, pd.CategoricalDtype):
+        # lowercase/probe the handful of categories once and gather by code
+        flags = np.append(moods.cat.categories.str.lower().map(_MOOD_SET.__contains__).to_numpy(dtype=float), 0.0)
+        return flags[moods.cat.codes.to_numpy()]
+    lowered = moods.astype(object).fillna("").astype(str).str.lower()
+    return lowered.map(_MOOD_SET.__contains__).to_numpy(dtype=float)
+
+def _compute_scores_vec(df):
+    # column-wise scoring for a whole frame (no per-row apply)
+    scores = compute_productivity_score_bulk(df["sleep_hours"], df["study_hours"], df["mood"])
+    return pd.Series(scores, index=df.index)
 
 def get_dataframe():
-    rows = fetch_logs()
-    if not rows:
+    # served from memory until the database file changes
+    return _get_df_cached(get_db_mtime())
+
+@st.cache_data(show_spinner=False)
+def _get_df_cached(mtime):
+    df = fetch_logs_df()
+    if df.empty:
+        return pd.DataFrame()
+    return _prepare(df)
+
+# enough for the score backfill in _prepare plus the summary/report views
+SUMMARY_COLS = ("date", "sleep_hours", "study_hours", "mood", "productivity_score")
+
+def get_columns_dataframe(cols=SUMMARY_COLS):
+    # like get_dataframe() but only loads `cols`; _prepare needs the sleep/study/mood/score ones
+    return _get_cols_cached(get_db_mtime(), tuple(cols))
+
+@st.cache_data(show_spinner=False)
+def _get_cols_cached(mtime, cols):
+    df = fetch_cols_df(cols)
+    if df.empty:
         return pd.DataFrame()
-    cols = ["id", "date", "sleep_hours", "study_hours", "activities", "mood",
-            "notes", "mode", "timestamp", "water_intake", "steps", "screen_time_minutes", "productivity_score"]
-    df = pd.DataFrame(rows, columns=cols)
-    df["date"] = pd.to_datetime(df["date"])
-
-    # ensure numeric types where possible
-    df["sleep_hours"] = pd.to_numeric(df["sleep_hours"], errors="coerce").fillna(0.0)
-    df["study_hours"] = pd.to_numeric(df["study_hours"], errors="coerce").fillna(0.0)
-    df["water_intake"] = pd.to_numeric(df["water_intake"], errors="coerce")
-    df["steps"] = pd.to_numeric(df["steps"], errors="coerce")
-    df["screen_time_minutes"] = pd.to_numeric(df["screen_time_minutes"], errors="coerce")
+    return _prepare(df)
+
+def get_recent_dataframe(n: int = 7):
+    # only the newest n logs, for views that never look further back
+    df = fetch_recent_logs_df(n)
+    if df.empty:
+        return pd.DataFrame()
+    return _prepare(df)
+
+def _prepare(df):
+    # dtypes already follow database.LOG_DTYPES (float32 / nullable Int32 / category)
+    for c in _FILL_ZERO:
+        df[c] = df[c].fillna(0.0)
 
     # fill productivity_score if missing
-    df["productivity_score"] = pd.to_numeric(df["productivity_score"], errors="coerce")
     missing_score = df["productivity_score"].isna()
     if missing_score.any():
-        df.loc[missing_score, "productivity_score"] = df[missing_score].apply(compute_productivity_score, axis=1)
+        scores = _compute_scores_vec(df.loc[missing_score])
+        df.loc[missing_score, "productivity_score"] = scores.astype(df["productivity_score"].dtype)
     return df
 
+def correlation_matrix(df, cols):
+    # np.corrcoef on one contiguous float block; same result as df[cols].corr()
+    arr = np.ascontiguousarray(df[cols].to_numpy(dtype=np.float64, na_value=np.nan))
+    if np.isnan(arr).any():
+        # missing values need pandas' pairwise-complete handling
+        return df[cols].corr()
+    with np.errstate(divide="ignore", invalid="ignore"):
+        cm = np.corrcoef(arr, rowvar=False)
+    return pd.DataFrame(cm, index=cols, columns=cols)
+
+def _period_summary(df, freq):
+    # group on period keys directly; rows are already date-sorted so sort=False keeps order
+    out = df.groupby(df["date"].dt.to_period(freq), sort=False).agg(**_PERIOD_AGG).round(2)
+    # label each period by its last day, as resample() did
+    out.index = out.index.to_timestamp(how="end").normalize()
+    out.index.name = "date"
+    return out
+
+@st.cache_data(show_spinner=False)
 def weekly_summary(df):
     if df.empty:
         return pd.DataFrame()
-    df2 = df.set_index("date").resample("W").agg({
-        "sleep_hours": "mean",
-        "study_hours": "sum",
-        "productivity_score": "mean"
-    }).round(2)
-    return df2
+    return _period_summary(df, "W")
 
+@st.cache_data(show_spinner=False)
 def monthly_summary(df):
     if df.empty:
         return pd.DataFrame()
-    df2 = df.set_index("date").resample("M").agg({
-        "sleep_hours": "mean",
-        "study_hours": "sum",
-        "productivity_score": "mean"
-    }).round(2)
-    return df2
+    return _period_summary(df, "M")
 
 def activity_heatmap_data(df):
     # produce counts of activities per weekday
     if df.empty:
         return pd.DataFrame()
-    df = df.copy()
-    df["weekday"] = df["date"].dt.day_name()
-
     # split activities by separators and count occurrences per weekday
-    rows = []
-    for _, r in df.iterrows():
-        acts = str(r.get("activities", "")).replace(";", ",").split(",")
-        for a in acts:
-            a_clean = a.strip().lower()
-            if a_clean:
-                rows.append({"weekday": r["weekday"], "activity": a_clean})
-    hf = pd.DataFrame(rows)
+    acts = df["activities"].fillna("").str.lower().str.split(_ACTIVITY_SEP)
+    hf = pd.DataFrame({"weekday": df["date"].dt.day_name(), "activity": acts}).explode("activity", ignore_index=True)
+    hf["activity"] = hf["activity"].str.strip()
+    hf = hf[hf["activity"] != ""]
     if hf.empty:
         return pd.DataFrame()
-    pivot = hf.pivot_table(index="activity", columns="weekday", aggfunc=len, fill_value=0)
+    # tokens repeat a lot; categorical codes make the crosstab a cheap integer count
+    pivot = pd.crosstab(hf["activity"].astype("category"), hf["weekday"].astype("category"))
     
     # reorder weekdays
-    weekday_order = ["Monday","Tuesday","Wednesday","Thursday","Friday","Saturday","Sunday"]
-    cols = [c for c in weekday_order if c in pivot.columns]
-    pivot = pivot[cols]
-    return pivot
+    return pivot.reindex(columns=[c for c in _WEEKDAYS if c in pivot.columns])
+
+def m4_downsample(x, y, width=1000):
+    """
+    M4 downsampling for line charts: keep the first, last, min and max point
+    of every pixel column so the plotted shape is unchanged.
+    x must be sorted. Returns sorted row positions to keep.
+    """
+    x = np.asarray(x)
+    y = np.asarray(y, dtype=float)
+    n = len(x)
+    if n < 4 * width:
+        return np.arange(n)
+    if np.issubdtype(x.dtype, np.datetime64):
+        x = x.astype("int64")
+
+    # start position of each non-empty bucket
+    edges = np.linspace(x[0], x[-1], width + 1)[:-1]
+    starts = np.unique(np.searchsorted(x, edges, side="left"))
+    starts = starts[starts < n]
+    ends = np.r_[starts[1:], n]
+    bucket = np.repeat(np.arange(len(starts)), ends - starts)
+
+    def _first_match(values):
+        idx = np.flatnonzero(y == values[bucket])
+        _, pos = np.unique(bucket[idx], return_index=True)
+        return idx[pos]
+
+    min_idx = _first_match(np.fmin.reduceat(y, starts))
+    max_idx = _first_match(np.fmax.reduceat(y, starts))
+    return np.unique(np.concatenate([starts, ends - 1, min_idx, max_idx]))
@@ -1,33 +1,90 @@
+import os
 import sqlite3
+import threading
+import pandas as pd
+import streamlit as st
 from config import DB_NAME
 from typing import List, Tuple, Optional
 
+LOG_COLUMNS = ("id", "date", "sleep_hours", "study_hours", "activities", "mood", "notes", "mode",
+               "timestamp", "water_intake", "steps", "screen_time_minutes", "productivity_score")
+
+# column dtypes for DataFrame loads (nullable Int32 for optional counts)
+LOG_DTYPES = {
+    "id": "int32",
+    "sleep_hours": "float32",
+    "study_hours": "float32",
+    "mood": "category",
+    "mode": "category",
+    "water_intake": "float32",
+    "steps": "Int32",
+    "screen_time_minutes": "Int32",
+    "productivity_score": "float32",
+}
+
+def _prod_score(sleep_hours, study_hours, mood):
+    # SQL-side productivity_score backfill, same formula as data_processing
+    from data_processing import compute_productivity_score  # imports this module
+    return compute_productivity_score({"sleep_hours": sleep_hours, "study_hours": study_hours, "mood": mood})
+
 def get_connection():
-    return sqlite3.connect(DB_NAME, check_same_thread=False)
+    conn = sqlite3.connect(DB_NAME, check_same_thread=False)
+    conn.create_function("prod_score", 3, _prod_score, deterministic=True)
+    # WAL keeps readers off the writer's lock; mmap serves reads from the page cache
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=NORMAL")
+    conn.execute("PRAGMA temp_store=MEMORY")
+    conn.execute("PRAGMA mmap_size=268435456")
+    return conn
+
+# one connection per process, reused across reruns; the lock serialises access
+# since the same handle is shared between Streamlit's script threads
+_lock = threading.Lock()
+
+@st.cache_resource
+def _conn():
+    return get_connection()
+
+def get_db_mtime() -> int:
+    # changes on every committed write; used as a cache key for loaded frames.
+    # In WAL mode commits land in the -wal file until a checkpoint, so check both.
+    mtime = 0
+    for path in (DB_NAME, DB_NAME + "-wal"):
+        try:
+            mtime = max(mtime, os.stat(path).st_mtime_ns)
+        except FileNotFoundError:
+            pass
+    return mtime
 
 def create_tables():
-    conn = get_connection()
-    c = conn.cursor()
     # A single table for daily logs with optional extra fields
-    c.execute("""
-    CREATE TABLE IF NOT EXISTS daily_logs (
-        id INTEGER PRIMARY KEY AUTOINCREMENT,
-        date TEXT NOT NULL,
-        sleep_hours REAL DEFAULT 0,
-        study_hours REAL DEFAULT 0,
-        activities TEXT,
-        mood TEXT,
-        notes TEXT,
-        mode TEXT DEFAULT 'student', -- 'student' or 'employee'
-        timestamp TEXT,
-        water_intake REAL,
-        steps INTEGER,
-        screen_time_minutes INTEGER,
-        productivity_score REAL
-    )
-    """)
-    conn.commit()
-    conn.close()
+    with _lock, _conn() as conn:
+        conn.execute("""
+        CREATE TABLE IF NOT EXISTS daily_logs (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            date TEXT NOT NULL,
+            sleep_hours REAL DEFAULT 0,
+            study_hours REAL DEFAULT 0,
+            activities TEXT,
+            mood TEXT,
+            notes TEXT,
+            mode TEXT DEFAULT 'student', -- 'student' or 'employee'
+            timestamp TEXT,
+            water_intake REAL,
+            steps INTEGER,
+            screen_time_minutes INTEGER,
+            productivity_score REAL
+        )
+        """)
+        # lets ORDER BY date / recent-N queries walk the index instead of sorting
+        conn.execute("CREATE INDEX IF NOT EXISTS idx_logs_date ON daily_logs(date)")
+
+_INSERT_SQL = """
+    INSERT INTO daily_logs
+    (date, sleep_hours, study_hours, activities, mood, notes, mode, timestamp,
+     water_intake, steps, screen_time_minutes, productivity_score)
+    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+"""
 
 def insert_log(date: str,
                sleep_hours: float,
@@ -41,17 +98,26 @@ def insert_log(date: str,
                steps: Optional[int] = None,
                screen_time_minutes: Optional[int] = None,
                productivity_score: Optional[float] = None):
-    conn = get_connection()
-    c = conn.cursor()
-    c.execute("""
-        INSERT INTO daily_logs
-        (date, sleep_hours, study_hours, activities, mood, notes, mode, timestamp,
-         water_intake, steps, screen_time_minutes, productivity_score)
-        VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-    """, (date, sleep_hours, study_hours, activities, mood, notes, mode, timestamp,
-          water_intake, steps, screen_time_minutes, productivity_score))
-    conn.commit()
-    conn.close()
+    with _lock, _conn() as conn:
+        conn.execute(_INSERT_SQL, (date, sleep_hours, study_hours, activities, mood, notes, mode,
+                                   timestamp, water_intake, steps, screen_time_minutes,
+                                   productivity_score))
+
+def insert_logs_many(records: List[Tuple]):
+    # bulk path: one transaction (one commit/fsync) for all rows.
+    # Each record follows the column order of _INSERT_SQL.
+    # Missing scores are stored filled in, as insert_log's callers do.
+    from data_processing import compute_productivity_score_bulk  # imports this module
+    records = [tuple(r) for r in records]
+    missing = [i for i, r in enumerate(records) if r[11] is None]
+    if missing:
+        scores = compute_productivity_score_bulk([records[i][1] or 0.0 for i in missing],
+                                                 [records[i][2] or 0.0 for i in missing],
+                                                 [records[i][4] for i in missing])
+        for i, score in zip(missing, scores):
+            records[i] = records[i][:11] + (float(score),)
+    with _lock, _conn() as conn:
+        conn.executemany(_INSERT_SQL, records)
 
 def update_log(log_id: int, **kwargs):
     if not kwargs:
@@ -63,27 +129,52 @@ def update_log(log_id: int, **kwargs):
         vals.append(v)
     vals.append(log_id)
     sql = f"UPDATE daily_logs SET {', '.join(keys)} WHERE id = ?"
-    conn = get_connection()
-    c = conn.cursor()
-    c.execute(sql, tuple(vals))
-    conn.commit()
-    conn.close()
+    with _lock, _conn() as conn:
+        conn.execute(sql, tuple(vals))
 
 def fetch_logs() -> List[Tuple]:
-    conn = get_connection()
-    c = conn.cursor()
-    c.execute("SELECT * FROM daily_logs ORDER BY date ASC")
-    rows = c.fetchall()
-    conn.close()
-    return rows
+    with _lock:
+        return _conn().execute("SELECT * FROM daily_logs ORDER BY date ASC").fetchall()
+
+def fetch_logs_df() -> pd.DataFrame:
+    # let pandas build the columns directly instead of going through row tuples
+    with _lock:
+        return pd.read_sql_query("SELECT * FROM daily_logs ORDER BY date ASC", _conn(),
+                                 parse_dates=["date"], dtype=LOG_DTYPES)
+
+def fetch_cols_df(cols) -> pd.DataFrame:
+    # narrow load for views that only need a few columns
+    unknown = set(cols) - set(LOG_COLUMNS)
+    if unknown:
+        raise ValueError(f"Unknown daily_logs columns: {sorted(unknown)}")
+    with _lock:
+        return pd.read_sql_query(f"SELECT {', '.join(cols)} FROM daily_logs ORDER BY date ASC", _conn(),
+                                 parse_dates=["date"] if "date" in cols else None,
+                                 dtype={c: t for c, t in LOG_DTYPES.items() if c in cols})
+
+def fetch_recent_logs_df(n: int = 50) -> pd.DataFrame:
+    # newest n rows, in ascending date order like fetch_logs(), as a typed DataFrame
+    with _lock:
+        return pd.read_sql_query("""
+            SELECT * FROM (SELECT * FROM daily_logs ORDER BY date DESC LIMIT ?)
+            ORDER BY date ASC
+        """, _conn(), params=(n,), parse_dates=["date"], dtype=LOG_DTYPES)
+
+def fetch_summary_stats() -> dict:
+    with _lock:
+        avg_sleep, avg_study, avg_prod, count = _conn().execute("""
+            SELECT AVG(COALESCE(sleep_hours, 0)), AVG(COALESCE(study_hours, 0)),
+                   AVG(COALESCE(productivity_score,
+                                prod_score(COALESCE(sleep_hours, 0), COALESCE(study_hours, 0), mood))),
+                   COUNT(*)
+            FROM daily_logs
+        """).fetchone()
+    return {"avg_sleep": avg_sleep, "avg_study": avg_study,
+            "avg_prod": avg_prod, "count": count}
 
 def fetch_log_by_id(log_id: int):
-    conn = get_connection()
-    c = conn.cursor()
-    c.execute("SELECT * FROM daily_logs WHERE id = ?", (log_id,))
-    row = c.fetchone()
-    conn.close()
-    return row
+    with _lock:
+        return _conn().execute("SELECT * FROM daily_logs WHERE id = ?", (log_id,)).fetchone()
 
 def export_csv(path: str = "habit_export.csv"):
     import csv
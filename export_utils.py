@@ -1,44 +1,47 @@
-from reportlab.lib.pagesizes import letter
-from reportlab.pdfgen import canvas
 import tempfile
 import os
-from data_processing import get_dataframe, weekly_summary
+from data_processing import get_columns_dataframe, weekly_summary
+
+def _rows(df, headers):
+    # numbers rounded, everything stringified in one pass; one list per table row
+    return [headers] + df.round(2).astype(str).values.tolist()
 
 def generate_pdf_report(path="habit_report.pdf"):
     """
     Simple PDF containing last 7 logs and a short summary.
     Requires reportlab.
     """
-    df = get_dataframe()
+    # reportlab is imported here so the app starts without loading it
+    from reportlab.lib import colors
+    from reportlab.lib.pagesizes import letter
+    from reportlab.lib.styles import getSampleStyleSheet
+    from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer, Table, TableStyle, PageBreak
+
+    # only the columns the report shows (plus mood for the score backfill)
+    df = get_columns_dataframe()
     if df.empty:
         raise ValueError("No data to create report.")
-    # create a temporary pdf
-    c = canvas.Canvas(path, pagesize=letter)
-    width, height = letter
-    c.setFont("Helvetica-Bold", 16)
-    c.drawString(40, height - 50, "Smart Habit & Productivity Report")
-    c.setFont("Helvetica", 10)
+    styles = getSampleStyleSheet()
+    table_style = TableStyle([
+        ("FONT", (0, 0), (-1, 0), "Helvetica-Bold", 10),
+        ("FONT", (0, 1), (-1, -1), "Helvetica", 10),
+        ("LINEBELOW", (0, 0), (-1, 0), 0.75, colors.grey),
+        ("ALIGN", (1, 1), (-1, -1), "RIGHT"),
+    ])
     last7 = df.tail(7)[["date", "sleep_hours", "study_hours", "productivity_score"]]
-    y = height - 80
-    c.drawString(40, y, "Last 7 Days:")
-    y -= 16
-    for _, r in last7.iterrows():
-        line = f"{r['date'].date()}  | sleep: {r['sleep_hours']}h  | study: {r['study_hours']}h  | score: {r['productivity_score']}"
-        c.drawString(40, y, line)
-        y -= 12
-        if y < 80:
-            c.showPage()
-            y = height - 40
-    # simple weekly summary
+    last7 = last7.assign(date=last7["date"].dt.date)
     ws = weekly_summary(df).reset_index().tail(4)
-    c.showPage()
-    c.setFont("Helvetica-Bold", 12)
-    c.drawString(40, height - 50, "Weekly Summary (last 4 weeks):")
-    c.setFont("Helvetica", 10)
-    y = height - 80
-    for _, r in ws.iterrows():
-        line = f"Week: {r['date'].date()} | avg sleep: {r['sleep_hours']} | total study: {r['study_hours']} | avg score: {r['productivity_score']}"
-        c.drawString(40, y, line)
-        y -= 14
-    c.save()
+    ws = ws.assign(date=ws["date"].dt.date)
+
+    # platypus lays out and paginates the tables itself
+    doc = SimpleDocTemplate(path, pagesize=letter, leftMargin=40, rightMargin=40, topMargin=40)
+    doc.build([
+        Paragraph("Smart Habit & Productivity Report", styles["Title"]),
+        Paragraph("Last 7 Days:", styles["Heading3"]),
+        Table(_rows(last7, ["Date", "Sleep (h)", "Study (h)", "Score"]), style=table_style, hAlign="LEFT"),
+        PageBreak(),
+        Paragraph("Weekly Summary (last 4 weeks):", styles["Heading3"]),
+        Spacer(1, 4),
+        Table(_rows(ws, ["Week", "Avg Sleep", "Total Study", "Avg Score"]), style=table_style, hAlign="LEFT"),
+    ])
     return os.path.abspath(path)
@@ -1,8 +1,34 @@
 # ml_utils.py
 import numpy as np
-from sklearn.cluster import KMeans
-from sklearn.linear_model import LinearRegression
-from sklearn.model_selection import train_test_split
+import streamlit as st
+
+# feature/target columns (lists, since df[tuple] is a single-key lookup)
+_CLUSTER_FEATURES = ["sleep_hours", "study_hours", "productivity_score"]
+_REG_FEATURES = ["sleep_hours", "study_hours", "water_intake"]
+_REG_TARGETS = ["study_hours", "productivity_score"]
+
+def _fp(df):
+    # cheap fingerprint of the training frame; the feature bytes disambiguate the rest
+    return (len(df), float(df["productivity_score"].sum()), float(df["sleep_hours"].sum()))
+
+# resource caches are not cleared with st.cache_data, so bound the fits kept
+# as the data changes with each insert/edit
+@st.cache_resource(show_spinner=False, max_entries=4)
+def _fit_kmeans(fp, X_bytes, k):
+    # sklearn is slow to import; only pay for it when clustering actually runs
+    from sklearn.cluster import KMeans
+    X = np.frombuffer(X_bytes, dtype=np.float64).reshape(fp[0], -1)
+    km = KMeans(n_clusters=k, random_state=42, n_init=10)
+    labels = km.fit_predict(X)
+    return km, labels
+
+def _lstsq(X, y):
+    # ordinary least squares with an intercept; y may hold several targets.
+    # Centre first (as LinearRegression does) so a constant feature gets a zero
+    # coefficient instead of soaking up part of the intercept.
+    x_mean, y_mean = X.mean(axis=0), y.mean(axis=0)
+    coef, *_ = np.linalg.lstsq(X - x_mean, y - y_mean, rcond=None)
+    return np.vstack([y_mean - x_mean @ coef, coef])
 
 def get_clusters(df):
     """
@@ -12,10 +38,10 @@ def get_clusters(df):
     try:
         if df.shape[0] < 3:
             return None, None, "Not enough data to form clusters (need at least 3 logs)."
-        X = df[["sleep_hours", "study_hours", "productivity_score"]].fillna(0).values
+        X = df[_CLUSTER_FEATURES].fillna(0).to_numpy(dtype=np.float64)
         k = min(4, max(2, df.shape[0] // 3))  # dynamic but small k
-        km = KMeans(n_clusters=k, random_state=42, n_init=10)
-        labels = km.fit_predict(X)
+        # refit only when the data changes (cached across reruns)
+        km, labels = _fit_kmeans(_fp(df), X.tobytes(), k)
         # Map cluster numbers into simple categories based on cluster centers
         centers = km.cluster_centers_
         # define descriptors using a heuristic: high study and high score => high-focus
@@ -38,40 +64,33 @@ def get_clusters(df):
 
 def train_regression(df):
     """
-    Trains a simple LinearRegression to predict study_hours and productivity_score.
-    Returns (models_dict, error_message). models_dict contains keys:
-      - 'study_model' : model to predict study_hours from sleep_hours and previous study
-      - 'productivity_model' : model to predict productivity_score
+    Fits a least-squares linear model to predict study_hours and productivity_score.
+    Returns (model, error_message). model is a dict with:
+      - 'beta' : (4, 2) coefficients [intercept, sleep, study, water] for
+                 the study_hours and productivity_score targets
     """
     try:
         if df.shape[0] < 2:
             return None, "Not enough data for regression (need at least 2 logs)."
         
         # Features: sleep_hours, study_hours (lag), water_intake can be added
-        X = df[["sleep_hours", "study_hours", "water_intake"]].fillna(0).values
-        y_study = df["study_hours"].fillna(0).values
-        y_score = df["productivity_score"].fillna(0).values
-
-        study_model = LinearRegression()
-        study_model.fit(X, y_study)
-
-        score_model = LinearRegression()
-        score_model.fit(X, y_score)
+        X = df[_REG_FEATURES].fillna(0).to_numpy(dtype=np.float64)
+        Y = df[_REG_TARGETS].fillna(0).to_numpy(dtype=np.float64)
 
-        return {"study_model": study_model, "score_model": score_model}, None
+        # both targets in one solve
+        return {"beta": _lstsq(X, Y)}, None
     except Exception as e:
         return None, f"Regression training error: {e}"
 
 def predict_next(models, sleep_hours: float, study_hours: float=0.0, water_intake: float=None):
     """
-    Predict next-day study_hours and productivity_score using provided models dict.
+    Predict next-day study_hours and productivity_score using the model from train_regression.
     """
     try:
         if models is None:
             return None, None
-        feat = np.array([[sleep_hours, study_hours, 0 if water_intake is None else water_intake]])
-        study_pred = models["study_model"].predict(feat)[0]
-        score_pred = models["score_model"].predict(feat)[0]
+        feat = [sleep_hours, study_hours, 0 if water_intake is None else water_intake]
+        study_pred, score_pred = np.r_[1, feat] @ models["beta"]
         return round(float(study_pred), 2), round(float(score_pred), 2)
     except Exception:
         return None, None
@@ -8,52 +8,118 @@ and the import `from google import genai`.
 If that is not available it falls back to the older
 `google.generativeai` package and its `GenerativeModel` API.
 """
+import functools
+import hashlib
+import json
+import os
+import re
+import threading
+import time
+import numpy as np
 import pandas as pd
 import traceback
+import warnings
+from typing import Iterator
 from config import GEMINI_API_KEY, GEMINI_MODEL
 
 import importlib
 
-# Dynamically import the new SDK (`google-genai`) if available. We use
-# importlib to avoid static import checks (Pylance) complaining when the
-# package isn't installed in the active interpreter.
-genai_v2 = None
-NEW_GENAI_AVAILABLE = False
-try:
-    # Try module path `google.genai` first
-    genai_v2 = importlib.import_module('google.genai')
-    NEW_GENAI_AVAILABLE = True
-except Exception:
-    try:
-        # Fallback: the `google` package may expose `genai` as an attribute
-        mod_google = importlib.import_module('google')
-        genai_v2 = getattr(mod_google, 'genai', None)
-        NEW_GENAI_AVAILABLE = genai_v2 is not None
-    except Exception:
-        genai_v2 = None
-        NEW_GENAI_AVAILABLE = False
+# The SDKs are imported on first use rather than at module load; they are
+# slow to import and not every page needs them. importlib avoids static
+# import checks (Pylance) complaining when a package isn't installed.
+_genai_cache = {}
 
-# Dynamically import the older `google.generativeai` package if present
-genai_v1 = None
-OLD_GENAI_AVAILABLE = False
-try:
-    genai_v1 = importlib.import_module('google.generativeai')
-    OLD_GENAI_AVAILABLE = True
-except Exception:
-    genai_v1 = None
-    OLD_GENAI_AVAILABLE = False
 
+def _load_genai():
+    """Return (genai_v2, genai_v1); either is None when not installed."""
+    if not _genai_cache:
+        # Try the new SDK (`google-genai`) at module path `google.genai` first
+        try:
+            genai_v2 = importlib.import_module('google.genai')
+        except Exception:
+            try:
+                # Fallback: the `google` package may expose `genai` as an attribute
+                genai_v2 = getattr(importlib.import_module('google'), 'genai', None)
+            except Exception:
+                genai_v2 = None
+        # The older `google.generativeai` package, if present
+        try:
+            genai_v1 = importlib.import_module('google.generativeai')
+        except Exception:
+            genai_v1 = None
+        _genai_cache["v2"], _genai_cache["v1"] = genai_v2, genai_v1
+    return _genai_cache["v2"], _genai_cache["v1"]
+
+
+def __getattr__(name):
+    # PEP 562: the old module-level SDK names still work, loading on first access
+    if name in ("genai_v2", "NEW_GENAI_AVAILABLE", "genai_v1", "OLD_GENAI_AVAILABLE"):
+        genai_v2, genai_v1 = _load_genai()
+        return {"genai_v2": genai_v2, "NEW_GENAI_AVAILABLE": genai_v2 is not None,
+                "genai_v1": genai_v1, "OLD_GENAI_AVAILABLE": genai_v1 is not None}[name]
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
+# JSON mode is constrained to a list of strings, so the tips never come back
+# as objects
+_TIPS_SCHEMA = {"type": "ARRAY", "items": {"type": "STRING"}}
+
+# Short, low-temperature JSON answers (also makes repeat prompts more cacheable)
+GENERATION_CONFIG = {
+    "max_output_tokens": 400,
+    "temperature": 0.2,
+    "response_mime_type": "application/json",
+    "response_schema": _TIPS_SCHEMA,
+}
+
+# streamed answers are plain markdown, so no JSON mime type or schema
+STREAM_CONFIG = {k: v for k, v in GENERATION_CONFIG.items()
+                 if k not in ("response_mime_type", "response_schema")}
+
+# Gemini 2.5 models think by default, and thinking tokens come out of
+# max_output_tokens. Flash can turn thinking off; Pro can't, so it gets its
+# minimum budget on top of the answer budget.
+_THINKING_BUDGET_PRO = 128
+
+
+def _model_config(config: dict) -> dict:
+    # per-model additions for the google-genai client (the legacy SDK has no
+    # thinking_config and gets the config as is)
+    if "2.5" not in GEMINI_MODEL:
+        return config
+    budget = 0 if "flash" in GEMINI_MODEL else _THINKING_BUDGET_PRO
+    return {**config, "thinking_config": {"thinking_budget": budget},
+            "max_output_tokens": config["max_output_tokens"] + budget}
+
+# Exact-match response cache: in-process dict in front of a shelve file so
+# identical prompts survive restarts. Entries expire after a day in both.
+_CACHE_DIR = os.path.join(os.path.expanduser("~"), ".habits_cache")
+_CACHE_TTL = 86400
+_cache_lock = threading.Lock()
+_MEM_CACHE_MAX = 128
+_mem_cache = {}
+
+
+# Semantic cache: responses for near-identical summaries are reused. Model,
+# mode and mood must match exactly; the numbers are compared as a vector of
+# (avg sleep, avg study, avg score, log(days)) and count as the same when
+# their distance is under _SEM_THRESHOLD. Entries expire after _CACHE_TTL,
+# like the exact-match cache.
+_SEM_THRESHOLD = 0.25
+_SEM_MAX = 256
+_SEM_PATH = os.path.join(_CACHE_DIR, "semantic.json")
+_sem = None
+_sem_lock = threading.Lock()
 
-def get_gemini_reco(df: pd.DataFrame, mode: str = "student") -> str:
-    """
-    Generate AI recommendations using the official Gemini API format.
-    Includes full error handling, valid model usage, and stable response parsing.
-    """
 
-    # 1. API key validation
+# last successful response, keyed on a hash of the input columns + mode
+_HASH_COLS = ['sleep_hours', 'study_hours', 'productivity_score', 'mood']
+_MEAN_COLS = ['sleep_hours', 'study_hours', 'productivity_score']
+_LAST = {"hash": None, "text": None}
 
-    if not GEMINI_API_KEY or GEMINI_API_KEY.strip() == "":
-        return """
+
+# User-facing messages, built once; the error branches only append the raw error.
+_API_KEY_ERR_MSG = """
         ❌ **Gemini API key missing.**
 
         Add your key inside `.env`:
@@ -63,120 +129,603 @@ def get_gemini_reco(df: pd.DataFrame, mode: str = "student") -> str:
 
         Restart the app after adding the key.
         """
-    
-    # 2. Configure Gemini
-  
+_API_KEY_SHORT_MSG = """
+        ❌ **Gemini API key looks malformed (too short).**
+
+        Check `GEMINI_API_KEY` in `.env` for a truncated or partial key,
+        stray quotes or whitespace.
+
+        Restart the app after fixing the key.
+        """
+_RATE_LIMIT_MSG = (
+    "⚠️ **Gemini Rate Limit / Quota Error**\n\n"
+    "Your key appears valid but has exceeded quota or rate limits.\n"
+    "Options:\n"
+    "1) Wait and retry later.\n"
+    "2) Check Google Cloud/Gemini quotas and billing.\n"
+    "3) Generate a new API key or upgrade your plan.\n\n"
+    "Raw error: "
+)
+_AUTH_ERR_MSG = (
+    "❌ **Authentication Error**\n\n"
+    "Gemini rejected the API key.\n"
+    "Ensure `.env` contains `GEMINI_API_KEY` with no quotes or extra whitespace.\n"
+    "Verify the key is active and has necessary permissions.\n\n"
+    "Raw error: "
+)
+_GENERIC_ERR_MSG = (
+    "⚠️ **Gemini API Error**\n\n"
+    "The app attempted both the new and old Gemini clients but none returned a usable response.\n"
+    "Troubleshoot:\n"
+    "- Install the new SDK: `pip install --upgrade google-genai`\n"
+    "- Or install the legacy package: `pip install --upgrade google-generativeai`\n"
+    "- Ensure `GEMINI_API_KEY` in `.env` is correct (no extra newline).\n"
+    "- Try different `GEMINI_MODEL` values like `gemini-1.5` or `gemini-2.5-flash`.\n\n"
+)
+
+
+_OFFLINE_HEADER = "**Quick suggestions (offline, Gemini unavailable):**\n\n"
+_STREAM_INTERRUPTED_MSG = "\n\n⚠️ *Response interrupted; the answer above may be incomplete. Try again.*"
+_NOT_ENOUGH_DATA_MSG = "Not enough data for recommendations (need at least 3 days of tracking)."
+_MIN_KEY_LEN = 20
+_MIN_ROWS = 3
+
+
+def _precheck(df: pd.DataFrame):
+    # requests that cannot succeed get their answer without any SDK/network work
+    key = (GEMINI_API_KEY or "").strip()
+    if not key:
+        return _API_KEY_ERR_MSG
+    if len(key) < _MIN_KEY_LEN:
+        return _API_KEY_SHORT_MSG
+    if df is None or len(df) < _MIN_ROWS:
+        return _NOT_ENOUGH_DATA_MSG
+    return None
+
+
+class _GeminiError(Exception):
+    """Raised from the cached call so failures are not cached."""
+
+
+class _RateLimited(Exception):
+    """The local request budget is used up."""
+
+
+# Client-side token bucket sized to the free tier (15 requests/minute), so a
+# burst of reruns waits on cached answers instead of collecting 429s.
+_RATE_LIMIT = 15
+_RATE_PERIOD = 60.0
+_bucket = {"tokens": float(_RATE_LIMIT), "last": time.monotonic()}
+_bucket_lock = threading.Lock()
+_RETRY_ATTEMPTS = 3
+
+# most recent good answer per mode, served when the bucket is empty
+_last_by_mode = {}
+
+
+def _take_token() -> bool:
+    with _bucket_lock:
+        now = time.monotonic()
+        _bucket["tokens"] = min(_RATE_LIMIT, _bucket["tokens"] + (now - _bucket["last"]) * _RATE_LIMIT / _RATE_PERIOD)
+        _bucket["last"] = now
+        if _bucket["tokens"] < 1:
+            return False
+        _bucket["tokens"] -= 1
+        return True
+
+
+def _is_rate_limit(e: Exception) -> bool:
+    msg = str(e)
+    return (type(e).__name__ == "ResourceExhausted" or getattr(e, "code", None) == 429
+            or "429" in msg or "RESOURCE_EXHAUSTED" in msg)
+
+
+def _with_retry(call):
+    # exponential backoff (1s, 2s, ... capped at 30s) on 429 / quota errors only
+    for attempt in range(_RETRY_ATTEMPTS):
+        try:
+            return call()
+        except Exception as e:
+            if attempt == _RETRY_ATTEMPTS - 1 or not _is_rate_limit(e):
+                raise
+            time.sleep(min(30, 2 ** attempt))
+
+
+def _most_common(col: pd.Series) -> str:
+    # factorize + bincount: one hash pass and an integer argmax, no sort
+    codes, uniques = pd.factorize(col)
+    codes = codes[codes >= 0]
+    if not codes.size:
+        return "N/A"
+    return str(uniques[np.bincount(codes).argmax()])
+
+
+def _data_hash(df: pd.DataFrame):
+    # content hash of the columns the summary reads; None if it can't be taken
     try:
-        if OLD_GENAI_AVAILABLE and genai_v1 is not None:
-            genai_v1.configure(api_key=GEMINI_API_KEY)
-    except Exception as e:
-        return f"❌ Failed to configure legacy Gemini client: {str(e)}"
+        return int(pd.util.hash_pandas_object(df[[c for c in _HASH_COLS if c in df]], index=False).sum())
+    except Exception:
+        return None
 
-  
-    # 3. Prepare Data Summary
-    
+
+# summaries of recently seen frames, so reruns over unchanged data skip the reductions
+_SUMMARY_MEMO_MAX = 32
+_summary_memo = {}
+
+
+def _summary_for(df: pd.DataFrame, data_hash=None) -> tuple:
+    if data_hash is None:
+        data_hash = _data_hash(df)
+        if data_hash is None:
+            return _summarize(df)
+    summary = _summary_memo.get(data_hash)
+    if summary is None:
+        summary = _summarize(df)
+        if len(_summary_memo) >= _SUMMARY_MEMO_MAX:
+            _summary_memo.pop(next(iter(_summary_memo)))
+        _summary_memo[data_hash] = summary
+    return summary
+
+
+def _summarize(df: pd.DataFrame) -> tuple:
+    # everything the prompt depends on, as a hashable cache key
+    # one float64 block and a NumPy nanmean; missing columns count as 0
+    arr = df.reindex(columns=_MEAN_COLS).to_numpy(dtype=np.float64, na_value=np.nan)
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore", RuntimeWarning)  # all-NaN column -> nan, like pandas
+        means = np.nanmean(arr, axis=0)
+    avg_sleep, avg_study, avg_prod = (float(m) if c in df else 0 for c, m in zip(_MEAN_COLS, means))
+    mood = _most_common(df['mood']) if 'mood' in df else "N/A"
+    # the prompt shows one decimal, so round to that for better cache hits
+    return round(avg_sleep, 1), round(avg_study, 1), round(avg_prod, 1), mood, len(df)
+
+
+# Prompt templates, filled with one %-format each. Terse on purpose: fewer
+# input tokens, and JSON keeps the answer short.
+_PROMPT_TMPL = "%s habits: sleep=%.1fh study=%.1fh prod=%.1f/10 days=%d mood=%s. Give 3-5 actionable tips as %s."
+_FMT_JSON = "a JSON list of strings"
+_FMT_MARKDOWN = "markdown bullets"
+_BATCH_HEAD_TMPL = ("Return a JSON array of %d items, one per user in order; "
+                    "each item is a JSON list of 3-5 actionable tips.")
+_BATCH_LINE_TMPL = "User %d (%s): sleep=%.1fh study=%.1fh prod=%.1f/10 days=%d mood=%s"
+
+
+def _build_prompt(summary: tuple, mode: str, as_json: bool = True) -> str:
+    avg_sleep, avg_study, avg_prod, mood, total_days = summary
+    return _PROMPT_TMPL % (mode, avg_sleep, avg_study, avg_prod, total_days, mood,
+                           _FMT_JSON if as_json else _FMT_MARKDOWN)
+
+
+def _format_tips(text) -> str:
+    # JSON list -> markdown bullets; anything else is shown as returned
     try:
-        avg_sleep = float(df['sleep_hours'].mean()) if 'sleep_hours' in df else 0
-        avg_study = float(df['study_hours'].mean()) if 'study_hours' in df else 0
-        avg_prod = float(df['productivity_score'].mean()) if 'productivity_score' in df else 0
-        mood = df['mood'].mode()[0] if 'mood' in df and not df['mood'].empty else "N/A"
-        total_days = len(df)
-    except Exception as e:
-        return f"❌ Error reading dataframe: {str(e)}"
+        tips = json.loads(text)
+    except (TypeError, ValueError):
+        return text if isinstance(text, str) else str(text)
+    if isinstance(tips, list) and tips:
+        return "\n".join(f"- {t}" for t in tips)
+    return text
+
+
+def _cache_key(prompt: str) -> str:
+    payload = {"model": GEMINI_MODEL, "prompt": prompt}
+    return hashlib.sha256(json.dumps(payload, sort_keys=True).encode()).hexdigest()
+
+
+def _disk_entry(key: str):
+    # (stored_at, text) if present and unexpired; the disk cache is
+    # best-effort, so any I/O problem is just a miss
+    import shelve
+    try:
+        with _cache_lock, shelve.open(os.path.join(_CACHE_DIR, "responses")) as db:
+            hit = db.get(key)
+    except Exception:
+        return None
+    if hit is None or time.time() - hit[0] > _CACHE_TTL:
+        return None
+    return hit
+
 
-    # 4. Build Prompt (Optimized)
-    prompt = f"""
-    Analyze this {mode}'s habit and productivity dataset and provide clear, highly actionable insights.
+def _disk_get(key: str):
+    hit = _disk_entry(key)
+    return hit[1] if hit is not None else None
 
-    === User Habit Summary ===
-    • Average Sleep: {avg_sleep:.1f} hrs/day
-    • Average Study/Work: {avg_study:.1f} hrs/day
-    • Average Productivity Score: {avg_prod:.1f}/10
-    • Total Days Tracked: {total_days}
-    • Most Common Mood: {mood}
 
-    === Requirements ===
-    1. Provide 3–5 key observations (specific to the numbers).
-    2. Give 3–5 actionable recommendations they can apply today.
-    3. Provide 2 productivity optimization tips backed by behavioral science.
-    4. Keep format clean and concise.
+def _disk_set(key: str, text: str):
+    import shelve
+    try:
+        os.makedirs(_CACHE_DIR, exist_ok=True)
+        with _cache_lock, shelve.open(os.path.join(_CACHE_DIR, "responses")) as db:
+            db[key] = (time.time(), text)
+    except Exception:
+        pass
+
+
+def _cached_generate(prompt_hash: str, prompt: str) -> str:
+    # failures raise, so only real (non-blank) answers are ever stored
+    hit = _mem_cache.get(prompt_hash)
+    if hit is None or time.time() - hit[0] > _CACHE_TTL or not hit[1].strip():
+        hit = _disk_entry(prompt_hash)
+        if hit is None or not isinstance(hit[1], str) or not hit[1].strip():
+            if not _take_token():
+                raise _RateLimited(f"Local rate limit reached ({_RATE_LIMIT} requests per minute); try again shortly.")
+            text = _format_tips(_generate(prompt))
+            if not text.strip():
+                raise _GeminiError() from ValueError("Gemini returned an empty answer.")
+            _disk_set(prompt_hash, text)
+            hit = (time.time(), text)
+        if len(_mem_cache) >= _MEM_CACHE_MAX:
+            _mem_cache.pop(next(iter(_mem_cache)))
+        _mem_cache[prompt_hash] = hit
+    return hit[1]
+
+
+def _sem_vector(summary: tuple) -> np.ndarray:
+    avg_sleep, avg_study, avg_prod, _, total_days = summary
+    return np.array([avg_sleep, avg_study, avg_prod, np.log(max(total_days, 1))], dtype=np.float32)
+
+
+def _sem_entries() -> dict:
+    # {(model, mode, mood): (vectors (n, 4), [texts], [timestamps])}, loaded
+    # from disk on first use; expired (or pre-timestamp) entries are dropped
+    global _sem
+    if _sem is None:
+        _sem = {}
+        try:
+            with open(_SEM_PATH, encoding="utf-8") as f:
+                rows = json.load(f)
+        except Exception:
+            rows = []
+        cutoff = time.time() - _CACHE_TTL
+        for e in rows:
+            try:
+                if e["ts"] >= cutoff:
+                    _sem_add((e["model"], e["mode"], e["mood"]), np.asarray(e["vec"], dtype=np.float32),
+                             e["text"], e["ts"])
+            except Exception:
+                continue
+    return _sem
+
 
-    Respond in a structured bullet-point format.
+def _sem_add(group: tuple, vec: np.ndarray, text: str, ts: float):
+    vecs, texts, stamps = _sem.get(group, (np.empty((0, vec.size), dtype=np.float32), [], []))
+    _sem[group] = (np.vstack([vecs, vec])[-_SEM_MAX:], (texts + [text])[-_SEM_MAX:],
+                   (stamps + [ts])[-_SEM_MAX:])
+
+
+def _sem_lookup(summary: tuple, mode: str):
+    with _sem_lock:
+        vecs, texts, stamps = _sem_entries().get((GEMINI_MODEL, mode, summary[3]), (None, None, None))
+    if vecs is None or not len(vecs):
+        return None
+    d = np.linalg.norm(vecs - _sem_vector(summary), axis=1)
+    d[np.asarray(stamps) < time.time() - _CACHE_TTL] = np.inf
+    i = int(d.argmin())
+    return texts[i] if d[i] < _SEM_THRESHOLD else None
+
+
+def _sem_store(summary: tuple, mode: str, text: str):
+    with _sem_lock:
+        _sem_entries()
+        _sem_add((GEMINI_MODEL, mode, summary[3]), _sem_vector(summary), text, time.time())
+        cutoff = time.time() - _CACHE_TTL
+        rows = [{"model": g[0], "mode": g[1], "mood": g[2], "vec": v.tolist(), "text": t, "ts": ts}
+                for g, (vecs, texts, stamps) in _sem.items()
+                for v, t, ts in zip(vecs, texts, stamps) if ts >= cutoff]
+        try:
+            os.makedirs(_CACHE_DIR, exist_ok=True)
+            with open(_SEM_PATH, "w", encoding="utf-8") as f:
+                json.dump(rows, f)
+        except Exception:
+            pass
+
+
+def _call_gemini(summary: tuple, mode: str) -> tuple:
+    """
+    Returns (text, fresh). fresh is False when the local budget is used up and
+    text is the last answer for `mode`, i.e. one generated for other data.
     """
+    # near-duplicate summary -> reuse; otherwise exact prompt cache, then Gemini
+    text = _sem_lookup(summary, mode)
+    if text is not None:
+        return text, True
+    prompt = _build_prompt(summary, mode)
+    try:
+        text = _cached_generate(_cache_key(prompt), prompt)
+    except _RateLimited as e:
+        # out of budget: a slightly stale answer beats an error
+        if mode in _last_by_mode:
+            return _last_by_mode[mode], False
+        raise _GeminiError() from e
+    _sem_store(summary, mode, text)
+    _last_by_mode[mode] = text
+    return text, True
+
+
+@functools.lru_cache(maxsize=4)
+def _get_client(api_key: str):
+    # one google-genai client per key, reused across calls
+    return _load_genai()[0].Client(api_key=api_key)
 
-    # 5. Generate Response (try new SDK first, then fallback)
+
+@functools.lru_cache(maxsize=4)
+def _get_model(name: str):
+    # legacy SDK: configure once, then one GenerativeModel per model name
+    genai_v1 = _load_genai()[1]
+    genai_v1.configure(api_key=GEMINI_API_KEY)
+    return genai_v1.GenerativeModel(model_name=name)
+
+
+def _response_text(resp) -> str:
+    # the answer text, or raise: a blocked / MAX_TOKENS response without text
+    # must not be cached or shown as if it were tips
+    try:
+        text = resp.text  # the legacy SDK raises here when there is no text
+    except Exception:
+        text = None
+    if not isinstance(text, str) or not text.strip():
+        # candidates/content fallback: join the text parts of the first candidate
+        try:
+            parts = resp.candidates[0].content.parts or []
+            text = "".join(p.text for p in parts if isinstance(getattr(p, "text", None), str))
+        except Exception:
+            text = None
+    if not isinstance(text, str) or not text.strip():
+        try:
+            reason = resp.candidates[0].finish_reason
+        except Exception:
+            reason = None
+        raise ValueError(f"Gemini returned no text (finish reason: {reason}).")
+    return text
+
+
+def _generate(prompt: str, config: dict = GENERATION_CONFIG) -> str:
+    # Generate Response (try new SDK first, then fallback)
     
+    genai_v2, genai_v1 = _load_genai()
     last_exception = None
 
     # Try new google-genai client (preferred)
-    if NEW_GENAI_AVAILABLE:
+    if genai_v2 is not None:
         try:
-            # Client reads GEMINI_API_KEY from environment automatically
-            client = genai_v2.Client()
-            resp = client.models.generate_content(model=GEMINI_MODEL, contents=prompt)
-            # Try common response shapes
-            if hasattr(resp, 'text') and resp.text:
-                return resp.text
-            # candidates/content fallbacks
-            if hasattr(resp, 'candidates') and resp.candidates:
-                try:
-                    cand = resp.candidates[0]
-                    if hasattr(cand, 'content'):
-                        return cand.content
-                    if hasattr(cand, 'text'):
-                        return cand.text
-                except Exception:
-                    pass
-            return str(resp)
+            # key passed explicitly so Streamlit secrets work without env vars
+            client = _get_client(GEMINI_API_KEY)
+            resp = _with_retry(lambda: client.models.generate_content(
+                model=GEMINI_MODEL, contents=prompt, config=_model_config(config)))
+            return _response_text(resp)
         except Exception as e:
             last_exception = e
 
     # Fallback to older package (google.generativeai)
-    if OLD_GENAI_AVAILABLE:
+    if genai_v1 is not None:
         try:
             # older package uses configure + GenerativeModel
-            genai_v1.configure(api_key=GEMINI_API_KEY)
-            model = genai_v1.GenerativeModel(model_name=GEMINI_MODEL)
-            response = model.generate_content(prompt)
-            text = getattr(response, 'text', None)
-            if text:
-                return text
-            return str(response)
+            model = _get_model(GEMINI_MODEL)
+            response = _with_retry(lambda: model.generate_content(prompt, generation_config=config))
+            return _response_text(response)
         except Exception as e:
             last_exception = e
 
-    # No client succeeded — provide helpful diagnostics
-    err_msg = str(last_exception) if last_exception else 'No compatible Gemini SDK found.'
-    low = err_msg.lower()
-    if 'quota' in low or 'rate' in low or 'limit' in low:
-        return (
-            "⚠️ **Gemini Rate Limit / Quota Error**\n\n"
-            "Your key appears valid but has exceeded quota or rate limits.\n"
-            "Options:\n"
-            "1) Wait and retry later.\n"
-            "2) Check Google Cloud/Gemini quotas and billing.\n"
-            "3) Generate a new API key or upgrade your plan.\n\n"
-            f"Raw error: {err_msg}"
-        )
-
-    if 'invalid' in low or 'unauthorized' in low or 'api key' in low:
-        return (
-            "❌ **Authentication Error**\n\n"
-            "Gemini rejected the API key.\n"
-            "Ensure `.env` contains `GEMINI_API_KEY` with no quotes or extra whitespace.\n"
-            "Verify the key is active and has necessary permissions.\n\n"
-            f"Raw error: {err_msg}"
-        )
-
-    # Generic fallback
-    tb = traceback.format_exc()
-    return (
-        "⚠️ **Gemini API Error**\n\n"
-        "The app attempted both the new and old Gemini clients but none returned a usable response.\n"
-        "Troubleshoot:\n"
-        "- Install the new SDK: `pip install --upgrade google-genai`\n"
-        "- Or install the legacy package: `pip install --upgrade google-generativeai`\n"
-        "- Ensure `GEMINI_API_KEY` in `.env` is correct (no extra newline).\n"
-        "- Try different `GEMINI_MODEL` values like `gemini-1.5` or `gemini-2.5-flash`.\n\n"
-        f"Last error: {err_msg}\n\nTraceback:\n{tb}"
-    )
+    raise _GeminiError() from last_exception
+
+
+def _generate_stream(prompt: str) -> Iterator[str]:
+    # same SDK order as _generate, yielding text chunks as they arrive
+    genai_v2, genai_v1 = _load_genai()
+    if genai_v2 is not None:
+        try:
+            stream = _get_client(GEMINI_API_KEY).models.generate_content_stream(
+                model=GEMINI_MODEL, contents=prompt, config=_model_config(STREAM_CONFIG))
+            first = next(iter(stream), None)
+        except Exception:
+            if genai_v1 is None:
+                raise
+        else:
+            if first is not None:
+                yield first.text or ""
+                for chunk in stream:
+                    yield chunk.text or ""
+            return
+    if genai_v1 is None:
+        raise RuntimeError("No compatible Gemini SDK found.")
+    for chunk in _get_model(GEMINI_MODEL).generate_content(prompt, generation_config=STREAM_CONFIG, stream=True):
+        yield chunk.text or ""
+
+
+def get_gemini_reco_stream(df: pd.DataFrame, mode: str = "student") -> Iterator[str]:
+    """
+    Like get_gemini_reco, but yields the answer in chunks as Gemini produces
+    it (for st.write_stream). Cached answers are yielded in one piece, and
+    anything that goes wrong falls back to get_gemini_reco's messages.
+    """
+    msg = _precheck(df)
+    if msg is not None:
+        yield msg
+        return
+    try:
+        summary = _summary_for(df)
+    except Exception:
+        yield get_gemini_reco(df, mode)
+        return
+
+    prompt = _build_prompt(summary, mode, as_json=False)
+    key = _cache_key(prompt)
+    # an empty cached answer is treated as a miss
+    text = _sem_lookup(summary, mode) or _disk_get(key) or None
+    if text is None and not _take_token():
+        # out of budget: stale answer or the usual rate-limit message
+        text = get_gemini_reco(df, mode)
+    if text is not None:
+        yield text
+        return
+
+    parts = []
+    try:
+        for chunk in _generate_stream(prompt):
+            parts.append(chunk)
+            yield chunk
+    except Exception:
+        if "".join(parts).strip():
+            yield _STREAM_INTERRUPTED_MSG
+            return
+    text = "".join(parts)
+    if not text.strip():
+        # nothing usable streamed (no chunks, a safety block, or an early error)
+        yield get_gemini_reco(df, mode)
+        return
+    # tee the streamed text into the same caches as the blocking path
+    _disk_set(key, text)
+    _sem_store(summary, mode, text)
+    _last_by_mode[mode] = text
+
+
+def _rule_based_reco(summary: tuple) -> str:
+    # local fallback from the same summary numbers; no network involved
+    avg_sleep, avg_study, avg_prod, _, _ = summary
+    tips = [
+        "😴 Increase sleep to 7-8h" if avg_sleep < 6.5 else "✅ Healthy sleep",
+        "📚 Aim for 3+h focused study" if avg_study < 3 else "✅ Good study time",
+        "🎯 Break work into pomodoros" if avg_prod < 6 else "🚀 Productivity on track",
+    ]
+    return _OFFLINE_HEADER + "\n".join(f"- {t}" for t in tips)
+
+
+def _quota_msg(err_msg: str, exc) -> str:
+    return _RATE_LIMIT_MSG + err_msg
+
+
+def _auth_msg(err_msg: str, exc) -> str:
+    return _AUTH_ERR_MSG + err_msg
+
+
+def _generic_msg(err_msg: str, exc) -> str:
+    tb = "".join(traceback.format_exception(type(exc), exc, exc.__traceback__)) if exc else ""
+    return f"{_GENERIC_ERR_MSG}Last error: {err_msg}\n\nTraceback:\n{tb}"
+
+
+# Error classification: SDK exception type names (google.api_core for the
+# legacy SDK) and HTTP status codes (google.genai errors carry .code) first,
+# then pre-compiled patterns over the message, quota before auth.
+_ERR_BY_TYPE = {
+    "ResourceExhausted": _quota_msg,
+    "TooManyRequests": _quota_msg,
+    "Unauthenticated": _auth_msg,
+    "PermissionDenied": _auth_msg,
+}
+_ERR_BY_CODE = {429: _quota_msg, 401: _auth_msg, 403: _auth_msg}
+_ERR_PATTERNS = (
+    (re.compile(r"quota|rate|limit", re.I), _quota_msg),
+    (re.compile(r"invalid|unauthorized|api key", re.I), _auth_msg),
+)
+
+
+def _error_message(exc) -> str:
+    err_msg = str(exc) if exc else 'No compatible Gemini SDK found.'
+    handler = _ERR_BY_TYPE.get(type(exc).__name__) or _ERR_BY_CODE.get(getattr(exc, "code", None))
+    if handler is None:
+        handler = next((h for pat, h in _ERR_PATTERNS if pat.search(err_msg)), _generic_msg)
+    return handler(err_msg, exc)
+
+
+def get_gemini_reco(df: pd.DataFrame, mode: str = "student") -> str:
+    """
+    Generate AI recommendations using the official Gemini API format.
+    Includes full error handling, valid model usage, and stable response parsing.
+    """
+
+    # 1. API key / data validation
+
+    msg = _precheck(df)
+    if msg is not None:
+        return msg
+    
+    # Same data as last time: skip the summary and cache lookup entirely
+    data_hash = _data_hash(df)
+    h = (data_hash, mode) if data_hash is not None else None
+    if h is not None and h == _LAST["hash"]:
+        return _LAST["text"]
+
+    # 2. Prepare Data Summary (SDK clients are set up once, on first use)
+    
+    try:
+        summary = _summary_for(df, data_hash)
+    except Exception as e:
+        return f"❌ Error reading dataframe: {str(e)}"
+
+    # 3/4. Build prompt and generate (cached per prompt hash)
+    try:
+        text, fresh = _call_gemini(summary, mode)
+        if fresh:
+            # a stale stand-in must not be pinned to this frame's hash
+            _LAST["hash"], _LAST["text"] = h, text
+        return text
+    except _GeminiError as e:
+        last_exception = e.__cause__
+
+    # No client succeeded — offline tips first, then helpful diagnostics
+    return _rule_based_reco(summary) + "\n\n---\n\n" + _error_message(last_exception)
+
+
+# Upper bound on users per batched request, to keep prompts/answers well
+# under the serving limits.
+_BATCH_MAX = 8
+
+
+def _build_batch_prompt(summaries: list, modes: list) -> str:
+    lines = [_BATCH_HEAD_TMPL % len(summaries)]
+    lines += [_BATCH_LINE_TMPL % (i, m, sl, st, p, d, mo)
+              for i, ((sl, st, p, mo, d), m) in enumerate(zip(summaries, modes))]
+    return "\n".join(lines)
+
+
+def _batch_config(n: int) -> dict:
+    # the single-user answer budget, once per user in the batch; one tip list per user
+    return {**GENERATION_CONFIG, "max_output_tokens": GENERATION_CONFIG["max_output_tokens"] * n,
+            "response_schema": {"type": "ARRAY", "items": _TIPS_SCHEMA}}
+
+
+def _reco_chunk(dfs: list, modes: list) -> list:
+    # one request for up to _BATCH_MAX users; any problem falls back to per-user calls
+    try:
+        summaries = [_summary_for(df) for df in dfs]
+        prompt = _build_batch_prompt(summaries, modes)
+        if not _take_token():
+            raise _RateLimited()
+        items = json.loads(_generate(prompt, _batch_config(len(dfs))))
+        if not isinstance(items, list) or len(items) != len(dfs):
+            raise ValueError("batch answer does not match the number of users")
+        texts = [_format_tips(json.dumps(item)) for item in items]
+    except Exception:
+        return [get_gemini_reco(df, mode) for df, mode in zip(dfs, modes)]
+    # store each answer where a later single-user call will look for it
+    for summary, mode, text in zip(summaries, modes, texts):
+        if text.strip():
+            _disk_set(_cache_key(_build_prompt(summary, mode)), text)
+            _sem_store(summary, mode, text)
+            _last_by_mode[mode] = text
+    return texts
+
+
+def get_gemini_reco_batch(dfs: list, modes: list = None) -> list:
+    """
+    Recommendations for several frames (users or modes) in as few Gemini calls
+    as possible. Returns one markdown string per frame, in order.
+    """
+    modes = list(modes) if modes is not None else ["student"] * len(dfs)
+    results = [_precheck(df) for df in dfs]
+    # only frames that passed the precheck go to Gemini
+    todo = [i for i, r in enumerate(results) if r is None]
+    for start in range(0, len(todo), _BATCH_MAX):
+        idx = todo[start:start + _BATCH_MAX]
+        for i, text in zip(idx, _reco_chunk([dfs[i] for i in idx], [modes[i] for i in idx])):
+            results[i] = text
+    return results
+
+
+async def get_gemini_reco_async(df: pd.DataFrame, mode: str = "student") -> str:
+    """
+    Awaitable get_gemini_reco. The blocking SDK call (and the caches in front
+    of it) run in a worker thread so callers can overlap it with other work.
+    """
+    import asyncio
+    return await asyncio.to_thread(get_gemini_reco, df, mode)
@@ -0,0 +1,42 @@
+import unittest
+
+import numpy as np
+import pandas as pd
+
+from ml_utils import predict_next, train_regression
+
+
+class TrainRegressionTest(unittest.TestCase):
+    def _frame(self, water):
+        rng = np.random.default_rng(0)
+        sleep = rng.uniform(4, 9, 40)
+        study = rng.uniform(0, 8, 40)
+        return pd.DataFrame({
+            "sleep_hours": sleep,
+            "study_hours": study,
+            "water_intake": water,
+            "productivity_score": 1.0 + 0.5 * sleep + 0.3 * study,
+        })
+
+    def test_constant_feature_keeps_full_intercept(self):
+        # a user who logs the same water every day must not lose part of the
+        # intercept when predicting with water_intake left at 0
+        model, err = train_regression(self._frame(2.0))
+        self.assertIsNone(err)
+        self.assertAlmostEqual(model["beta"][3, 1], 0.0)
+        _, score = predict_next(model, 7.0, 4.0)
+        self.assertAlmostEqual(score, 1.0 + 0.5 * 7.0 + 0.3 * 4.0, places=2)
+
+    def test_matches_linear_regression(self):
+        from sklearn.linear_model import LinearRegression
+        df = self._frame(np.linspace(1, 3, 40))
+        model, _ = train_regression(df)
+        X = df[["sleep_hours", "study_hours", "water_intake"]]
+        lr = LinearRegression().fit(X, df["productivity_score"])
+        _, score = predict_next(model, 6.5, 3.0, 2.5)
+        expected = lr.predict(pd.DataFrame([[6.5, 3.0, 2.5]], columns=X.columns))[0]
+        self.assertAlmostEqual(score, round(expected, 2))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,63 @@
+import os
+import tempfile
+import types
+import unittest
+from unittest import mock
+
+import pandas as pd
+
+import recommendations as reco
+
+
+def _frame(sleep):
+    return pd.DataFrame({
+        "sleep_hours": [sleep] * 3,
+        "study_hours": [2.0, 3.0, 4.0],
+        "productivity_score": [5.0, 6.0, 7.0],
+        "mood": ["happy"] * 3,
+    })
+
+
+class RateLimitedRecoTest(unittest.TestCase):
+    def setUp(self):
+        tmp = tempfile.mkdtemp()
+        self.calls = []
+
+        def generate_content(model, contents, config):
+            self.calls.append(contents)
+            return types.SimpleNamespace(text='["tip %d"]' % len(self.calls))
+
+        client = types.SimpleNamespace(models=types.SimpleNamespace(generate_content=generate_content))
+        sdk = types.SimpleNamespace(Client=lambda api_key: client)
+        for patch in (
+            mock.patch.object(reco, "GEMINI_API_KEY", "k" * 30),
+            mock.patch.object(reco, "_CACHE_DIR", tmp),
+            mock.patch.object(reco, "_SEM_PATH", os.path.join(tmp, "semantic.json")),
+            mock.patch.object(reco, "_sem", None),
+            mock.patch.dict(reco._genai_cache, {"v2": sdk, "v1": None}),
+            mock.patch.dict(reco._LAST, {"hash": None, "text": None}),
+            mock.patch.dict(reco._last_by_mode, clear=True),
+            mock.patch.dict(reco._mem_cache, clear=True),
+            mock.patch.dict(reco._bucket),
+        ):
+            patch.start()
+            self.addCleanup(patch.stop)
+        reco._get_client.cache_clear()
+        self.addCleanup(reco._get_client.cache_clear)
+
+    def test_stale_answer_is_not_pinned_to_new_data(self):
+        first = reco.get_gemini_reco(_frame(5.0))
+        self.assertEqual(first, "- tip 1")
+
+        # out of budget: the previous answer stands in for the new data...
+        reco._bucket["tokens"] = 0.0
+        self.assertEqual(reco.get_gemini_reco(_frame(9.0)), first)
+
+        # ...but once the budget is back, the new data gets its own answer
+        reco._bucket["tokens"] = float(reco._RATE_LIMIT)
+        self.assertEqual(reco.get_gemini_reco(_frame(9.0)), "- tip 2")
+        self.assertEqual(len(self.calls), 2)
+
+
+if __name__ == "__main__":
+    unittest.main()